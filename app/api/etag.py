@@ -0,0 +1,37 @@
+import hashlib
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Response
+
+ETAG_HEADER = "ETag"
+LAST_MODIFIED_HEADER = "Last-Modified"
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag from the version columns of everything in a response.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def unmodified_since(if_modified_since: Optional[str], last_modified: str) -> bool:
+    """True if the client's If-Modified-Since is at or after `last_modified` (both HTTP dates)."""
+    if not if_modified_since:
+        return False
+    try:
+        return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), ETAG_HEADER: etag})
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Header used to hand the next keyset cursor back to the client.
+# CORS already exposes all headers, so browsers can read it.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """
+    Pack the sort key of the last row of a page into an opaque, URL-safe string.
+    """
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError("cursor must decode to a list")
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_date_id_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode a cursor produced by `encode_cursor(date, id)`.
+    """
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        date, row_id = values
+        return datetime.fromisoformat(date), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decode a cursor produced by `encode_cursor(id)`.
+    """
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        (row_id,) = values
+        return int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_distance_id_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """
+    Decode a cursor produced by `encode_cursor(distance, id)`.
+    """
+    if not cursor:
+        return None
+    values = decode_cursor(cursor)
+    try:
+        distance, row_id = values
+        return float(distance), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,19 +1,20 @@
 from fastapi import APIRouter, HTTPException, Header, Depends
 from schemas.user import UserRegister, UserOut
 from models.user import User
-import jwt, os
 from pydantic import BaseModel
-from core import firebase
+from app.core import firebase
 from fastapi.security import OAuth2PasswordBearer
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from types import SimpleNamespace
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.passwords import hash_password, verify_password
+from app.core.ratelimit import limit_by_ip
+from app.core.security import REFRESH_TOKEN, create_token_pair, decode_backend_token
+from app.db.database import get_async_db
+from app.services.users import resolve_firebase_user
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
-SECRET = os.getenv("JWT_SECRET", "supersecret")
-
-# In-memory databases
-db_users = {}
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -21,78 +22,92 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-@router.post("/register", response_model=UserOut)
-def register(payload: UserRegister):
-    if payload.email in db_users:
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+@router.post("/register", response_model=UserOut, dependencies=[Depends(limit_by_ip("auth"))])
+async def register(payload: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    email = normalize_email(payload.email)
+    # Cheap pre-check so duplicates don't pay for a hash; the unique index on
+    # users.email is what actually guarantees it under concurrent registrations
+    if await db.scalar(select(User.id).where(User.email == email)):
         raise HTTPException(status_code=400, detail="Email already exists")
+
     new_user = User(
-        id=str(len(db_users) + 1),
         name=payload.name,
-        email=payload.email,
-        password=payload.password
+        email=email,
+        password=await hash_password(payload.password),
     )
-    db_users[payload.email] = new_user
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already exists")
     return UserOut(
         id=new_user.id,
         name=new_user.name,
         email=new_user.email
     )
 
-@router.post("/login")
-def login(payload: LoginRequest):
-    user = db_users.get(payload.email)
+@router.post("/login", dependencies=[Depends(limit_by_ip("auth"))])
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == normalize_email(payload.email)))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if user.password != payload.password:
+    # Firebase-only accounts have no password
+    if not user.password or not await verify_password(payload.password, user.password):
         raise HTTPException(status_code=401, detail="Incorrect password")
-    jwt_token = jwt.encode({"id": user.id, "email": user.email}, SECRET, algorithm="HS256")
-    return {"access_token": jwt_token}
+    return create_token_pair(user)
+
+@router.post("/refresh", dependencies=[Depends(limit_by_ip("auth"))])
+def refresh(payload: RefreshRequest):
+    """
+    Trade a refresh token for a new access/refresh pair. Stateless: the
+    claims are carried over without a database lookup.
+    """
+    claims = decode_backend_token(payload.refresh_token, REFRESH_TOKEN)
+    user = SimpleNamespace(id=claims["sub"], email=claims.get("email"), name=claims.get("name"))
+    return create_token_pair(user, uid=claims.get("uid"))
 
 @router.get("/me", response_model=UserOut)
-def me(token: str = Depends(oauth2_scheme)):
-    try:
-        data = jwt.decode(token, SECRET, algorithms=["HS256"])
-        user = db_users.get(data["email"])
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return UserOut(
-            id=user.id,
-            name=user.name,
-            email=user.email
-        )
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid JWT")
-
-@router.get("/me-firebase", response_model=UserOut)
-def me_firebase(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    decoded_token = firebase.verify_firebase_token(token)
+async def me(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    claims = decode_backend_token(token)
+    user = await db.get(User, int(claims["sub"]))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserOut(
+        id=user.id,
+        name=user.name,
+        email=user.email
+    )
 
-    uid = decoded_token.get("uid")
-    email = decoded_token.get("email")
-    name = decoded_token.get("name", "No Name")
+def _verify_firebase(token: str) -> dict:
+    decoded_token = firebase.verify_firebase_token(token)
+    if not decoded_token or not decoded_token.get("uid"):
+        raise HTTPException(status_code=401, detail="Invalid Firebase token")
+    return decoded_token
 
-    # Try to find user by firebase_uid
-    user = None
-    if uid:
-        user = db.query(User).filter(getattr(User, "firebase_uid") == uid).first()
 
-    # Fallback: find by email
-    if not user and email:
-        user = db.query(User).filter(User.email == email).first()
+async def _resolve_token_user(decoded_token: dict, db: AsyncSession):
+    email = decoded_token.get("email")
+    return await resolve_firebase_user(
+        db,
+        decoded_token["uid"],
+        # Normalized like /auth/register so both paths link to the same account
+        email=normalize_email(email) if email else None,
+        name=decoded_token.get("name", "No Name"),
+    )
 
-    # Create user if not found
-    if not user:
-        new_user = User(
-            name=name,
-            email=email or f"{uid}@firebase.local",
-            password=None,
-            firebase_uid=uid,
-        )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        user = new_user
 
+@router.get("/me-firebase", response_model=UserOut, dependencies=[Depends(limit_by_ip("auth"))])
+async def me_firebase(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user = await _resolve_token_user(_verify_firebase(token), db)
     return UserOut(
         id=user.id,
         name=user.name,
@@ -104,43 +119,13 @@ def test_auth():
     return {"message": "Auth route works"}
 
 
-@router.post("/exchange")
-def exchange_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@router.post("/exchange", dependencies=[Depends(limit_by_ip("auth"))])
+async def exchange_token(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     """
-    Exchange a Firebase ID token (Bearer) for a backend JWT.
-    The frontend should send the Firebase ID token as `Authorization: Bearer <idToken>`.
+    Exchange a Firebase ID token (Bearer) for a backend access/refresh pair.
+    The frontend should send the Firebase ID token as `Authorization: Bearer <idToken>`,
+    then use the access token on every other route and /auth/refresh to renew it.
     """
-    decoded_token = firebase.verify_firebase_token(token)
-
-    # Ensure user exists (re-use me_firebase logic)
-    uid = decoded_token.get("uid")
-    email = decoded_token.get("email")
-    name = decoded_token.get("name", "No Name")
-
-    user = None
-    if uid:
-        user = db.query(User).filter(getattr(User, "firebase_uid") == uid).first()
-    if not user and email:
-        user = db.query(User).filter(User.email == email).first()
-    if not user:
-        new_user = User(
-            name=name,
-            email=email or f"{uid}@firebase.local",
-            password=None,
-            firebase_uid=uid,
-        )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        user = new_user
-
-    # Create backend JWT
-    expire = datetime.utcnow() + timedelta(hours=6)
-    payload = {
-        "sub": str(user.id),
-        "email": user.email,
-        "exp": expire,
-    }
-    jwt_token = jwt.encode(payload, SECRET, algorithm="HS256")
-
-    return {"access_token": jwt_token, "token_type": "bearer", "expires_at": expire.isoformat()}
+    decoded_token = _verify_firebase(token)
+    user = await _resolve_token_user(decoded_token, db)
+    return create_token_pair(user, uid=decoded_token["uid"])
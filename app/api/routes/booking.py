@@ -1,153 +1,519 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
-from app.core.security import get_current_user
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.db.database import AsyncSessionLocal, get_async_db, get_async_write_db
+from app.db.replicas import mark_write, read_session
+from app.api.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_id_cursor,
+    encode_cursor,
+)
+from app.api.etag import ETAG_HEADER, etag_matches, make_etag, not_modified
+from app.core.idempotency import idempotency_store
+from app.core.ratelimit import limit_by_user
+from app.core.response_cache import (
+    EVENTS_LIST_CACHE,
+    FAST_JSON_RESPONSES,
+    dump_json,
+    event_cache_namespace,
+    json_response,
+    response_cache,
+    user_feed_cache_namespace,
+)
+from app.core.security import FEED_TOKEN, create_feed_token, decode_backend_token, get_current_user
+from app.services import calendar, jobs, live, reservations
+from app.services.notifications import promoted_payload
 
 from models.booking import Booking
 from models.event import Event
 from models.user import User
-from schemas.booking import BookingResponse, BookingCreate, BookingCancel, BookingWithUser, BookingWithEvent
+from schemas.booking import BookingResponse, BookingCreate, BookingCancel, BookingBatch, BookingWithUser, BookingWithEvent
 from schemas.event import EventCreate, EventOut, EventUpdate
 
 router = APIRouter()
 
+MAX_BATCH_EVENTS = 100
 
-@router.post("/rsvp", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def rsvp_to_event(
+
+def _booking_json(bookings, status_code: int = status.HTTP_201_CREATED):
+    if isinstance(bookings, list):
+        body = [BookingResponse.from_orm(booking) for booking in bookings]
+    else:
+        body = BookingResponse.from_orm(bookings)
+    return json_response(dump_json(jsonable_encoder(body)), status_code=status_code)
+
+
+def _batch_event_ids(batch: BookingBatch) -> list:
+    event_ids = sorted(set(batch.event_ids))
+    if not event_ids:
+        raise HTTPException(400, "event_ids must not be empty")
+    if len(event_ids) > MAX_BATCH_EVENTS:
+        raise HTTPException(400, f"At most {MAX_BATCH_EVENTS} events per request")
+    return event_ids
+
+
+@router.post("/rsvp", response_model=BookingResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_by_user("bookings"))])
+async def rsvp_to_event(
     booking: BookingCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    User RSVPs to an event
+    User RSVPs to an event. When the event is full the booking is
+    waitlisted and promoted automatically as seats free up.
+    Retries carrying the same Idempotency-Key get the original response.
     """
-    # Check if event exists
-    event = db.query(Event).filter(Event.id == booking.event_id).first()
-    if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event not found"
+    async def create():
+        # Check if event exists
+        event_exists = await db.scalar(select(Event.id).where(Event.id == booking.event_id))
+        if not event_exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Event not found"
+            )
+
+        # The unique (user_id, event_id) index prevents double booking, even
+        # when the same user sends several RSVPs at once
+        try:
+            new_booking = await reservations.reserve(db, current_user.id, booking.event_id)
+            jobs.enqueue(db, "booking.created", {
+                "user_id": current_user.id,
+                "bookings": [{"event_id": booking.event_id, "status": new_booking.status}],
+            })
+            await db.commit()
+            await mark_write(EVENTS_LIST_CACHE, event_cache_namespace(booking.event_id), f"user:{current_user.id}")
+            # attendee_count is part of the cached GET /events/{id} and list bodies
+            await response_cache.invalidate(
+                EVENTS_LIST_CACHE, event_cache_namespace(booking.event_id), user_feed_cache_namespace(current_user.id)
+            )
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You have already RSVP'd to this event"
+            )
+
+        await db.refresh(new_booking)
+        await live.publish_counts(db, booking.event_id)
+        return _booking_json(new_booking)
+
+    return await idempotency_store.run(f"rsvp:{current_user.id}", idempotency_key, booking.dict(), create)
+
+
+# RSVP TO MANY EVENTS
+@router.post("/rsvp/batch", response_model=List[BookingResponse], status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_by_user("bookings"))])
+async def rsvp_to_events(
+    batch: BookingBatch,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_write_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    RSVP to several events in one transaction: either every booking is
+    created (confirmed or waitlisted per event) or none is.
+    """
+    event_ids = _batch_event_ids(batch)
+
+    async def create():
+        found = set((await db.scalars(select(Event.id).where(Event.id.in_(event_ids)))).all())
+        missing = [event_id for event_id in event_ids if event_id not in found]
+        if missing:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"Events not found: {missing}")
+
+        booked = (
+            await db.scalars(
+                select(Booking.event_id).where(Booking.user_id == current_user.id, Booking.event_id.in_(event_ids))
+            )
+        ).all()
+        if booked:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"You have already RSVP'd to events: {sorted(booked)}")
+
+        try:
+            bookings = await reservations.reserve_many(db, current_user.id, event_ids)
+            jobs.enqueue(db, "booking.created", {
+                "user_id": current_user.id,
+                "bookings": [{"event_id": b.event_id, "status": b.status} for b in bookings],
+            })
+            await db.commit()
+        except IntegrityError:
+            # A concurrent RSVP for one of the events got in first
+            await db.rollback()
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "You have already RSVP'd to one of these events")
+        await mark_write(
+            EVENTS_LIST_CACHE, *(event_cache_namespace(event_id) for event_id in event_ids), f"user:{current_user.id}"
         )
-    
-    # Check if user already has a booking for this event (prevent double booking)
-    existing_booking = db.query(Booking).filter(
-        Booking.user_id == current_user.id,
-        Booking.event_id == booking.event_id
-    ).first()
-    
-    if existing_booking:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already RSVP'd to this event"
+        await response_cache.invalidate(
+            EVENTS_LIST_CACHE,
+            *(event_cache_namespace(event_id) for event_id in event_ids),
+            user_feed_cache_namespace(current_user.id),
         )
-    
-    # Create new booking
-    new_booking = Booking(
-        user_id=current_user.id,
-        event_id=booking.event_id
-    )
-    
-    db.add(new_booking)
-    db.commit()
-    db.refresh(new_booking)
-    
-    return new_booking
+        await live.publish_counts(db, *event_ids)
+        return _booking_json(bookings)
+
+    return await idempotency_store.run(f"rsvp-batch:{current_user.id}", idempotency_key, {"event_ids": event_ids}, create)
 
 
-@router.delete("/cancel", status_code=status.HTTP_200_OK)
-def cancel_rsvp(
+@router.delete("/cancel", status_code=status.HTTP_200_OK, dependencies=[Depends(limit_by_user("bookings"))])
+async def cancel_rsvp(
     booking: BookingCancel,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_write_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    User cancels their RSVP for an event
+    User cancels their RSVP for an event. A freed seat goes to the
+    oldest waitlisted booking.
     """
-    # Find the booking
-    existing_booking = db.query(Booking).filter(
-        Booking.user_id == current_user.id,
-        Booking.event_id == booking.event_id
-    ).first()
-    
-    if not existing_booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="RSVP not found"
+    async def cancel():
+        # Find the booking
+        existing_booking = await db.scalar(select(Booking).where(
+            Booking.user_id == current_user.id,
+            Booking.event_id == booking.event_id
+        ).with_for_update())
+
+        if not existing_booking:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="RSVP not found"
+            )
+
+        promoted = await reservations.cancel(db, existing_booking)
+        jobs.enqueue(db, "booking.cancelled", {"user_id": current_user.id, "event_ids": [booking.event_id]})
+        if promoted:
+            jobs.enqueue(db, "bookings.promoted", promoted_payload(promoted))
+        await db.commit()
+        await mark_write(EVENTS_LIST_CACHE, event_cache_namespace(booking.event_id), f"user:{current_user.id}")
+        # Promoted users' feeds change from TENTATIVE to CONFIRMED
+        await response_cache.invalidate(
+            EVENTS_LIST_CACHE,
+            event_cache_namespace(booking.event_id),
+            user_feed_cache_namespace(current_user.id),
+            *(user_feed_cache_namespace(b.user_id) for b in promoted),
+        )
+        await live.publish_counts(db, booking.event_id)
+
+        return json_response(dump_json({"message": "RSVP cancelled successfully"}))
+
+    return await idempotency_store.run(f"cancel:{current_user.id}", idempotency_key, booking.dict(), cancel)
+
+
+# CANCEL MANY RSVPS
+@router.delete("/cancel/batch", status_code=status.HTTP_200_OK, dependencies=[Depends(limit_by_user("bookings"))])
+async def cancel_rsvps(
+    batch: BookingBatch,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_write_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel RSVPs for several events in one transaction. Fails without
+    cancelling anything if any of them isn't booked.
+    """
+    event_ids = _batch_event_ids(batch)
+
+    async def cancel():
+        bookings = (
+            await db.scalars(
+                select(Booking)
+                .where(Booking.user_id == current_user.id, Booking.event_id.in_(event_ids))
+                .with_for_update()
+            )
+        ).all()
+        missing = sorted(set(event_ids) - {booking.event_id for booking in bookings})
+        if missing:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, f"RSVPs not found for events: {missing}")
+
+        promoted = await reservations.cancel_many(db, bookings)
+        jobs.enqueue(db, "booking.cancelled", {"user_id": current_user.id, "event_ids": event_ids})
+        if promoted:
+            jobs.enqueue(db, "bookings.promoted", promoted_payload(promoted))
+        await db.commit()
+        await mark_write(
+            EVENTS_LIST_CACHE, *(event_cache_namespace(event_id) for event_id in event_ids), f"user:{current_user.id}"
         )
-    
-    # Delete the booking
-    db.delete(existing_booking)
-    db.commit()
-    
-    return {"message": "RSVP cancelled successfully"}
+        await response_cache.invalidate(
+            EVENTS_LIST_CACHE,
+            *(event_cache_namespace(event_id) for event_id in event_ids),
+            user_feed_cache_namespace(current_user.id),
+            *(user_feed_cache_namespace(b.user_id) for b in promoted),
+        )
+        await live.publish_counts(db, *event_ids)
+
+        return json_response(dump_json({"message": "RSVPs cancelled successfully", "event_ids": event_ids}))
+
+    return await idempotency_store.run(f"cancel-batch:{current_user.id}", idempotency_key, {"event_ids": event_ids}, cancel)
 
 
 @router.get("/event/{event_id}", response_model=List[BookingWithUser])
-def get_event_attendees(
+async def get_event_attendees(
     event_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    db: AsyncSession = Depends(read_session("event:{event_id}", per_user=True)),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get list of attendees for an event (organizers can see attendee list)
     """
     # Check if event exists
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    event_exists = await db.scalar(select(Event.id).where(Event.id == event_id))
+    if not event_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found"
+        )
+
+    # One JOIN per page instead of a lazy load of booking.user per row
+    query = (
+        select(
+            Booking.id,
+            Booking.user_id,
+            Booking.event_id,
+            Booking.status,
+            Booking.created_at,
+            User.name.label("user_name"),
+            User.email.label("user_email"),
+        )
+        .join(User, User.id == Booking.user_id)
+        .where(Booking.event_id == event_id)
+    )
+    after_id = decode_id_cursor(after)
+    if after_id is not None:
+        query = query.where(Booking.id > after_id)
+    rows = (await db.execute(query.order_by(Booking.id).limit(limit + 1))).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+
+    body = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "event_id": row.event_id,
+            "status": row.status,
+            "created_at": row.created_at,
+            "user": {"id": row.user_id, "name": row.user_name, "email": row.user_email},
+        }
+        for row in rows
+    ]
+    if FAST_JSON_RESPONSES:
+        # Serialized straight from the row tuples; response_model only documents the shape
+        return json_response(dump_json(body), headers)
+    response.headers.update(headers)
+    return body
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["booking_id", "user_id", "name", "email", "status", "created_at"]
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+async def _stream_attendees(event_id: int, fmt: str):
+    """
+    Yield the attendee list in chunks straight from a server-side cursor.
+    Uses its own session because the response body is produced after the
+    request's dependencies may have been torn down.
+    """
+    query = (
+        select(
+            Booking.id,
+            Booking.user_id,
+            User.name,
+            User.email,
+            Booking.status,
+            Booking.created_at,
+        )
+        .join(User, User.id == Booking.user_id)
+        .where(Booking.event_id == event_id)
+        .order_by(Booking.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(
+                    (row.id, row.user_id, row.name, row.email, row.status,
+                     row.created_at.isoformat() if row.created_at else "")
+                    for row in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, (
+                        row.id, row.user_id, row.name, row.email, row.status,
+                        row.created_at.isoformat() if row.created_at else None,
+                    )))) + "\n"
+                    for row in partition
+                )
+
+
+@router.get("/event/{event_id}/export")
+async def export_event_attendees(
+    event_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream the full attendee list of an event as CSV or NDJSON (organizer only).
+    Memory use stays flat regardless of the number of attendees.
+    """
+    organizer_id = await db.scalar(select(Event.organizer_id).where(Event.id == event_id))
+    if organizer_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    
-   
-    
-    # Get all bookings for this event
-    bookings = db.query(Booking).filter(Booking.event_id == event_id).all()
-    
-    # Format response with user details
-    result = []
-    for booking in bookings:
-        result.append({
-            "id": booking.id,
-            "user_id": booking.user_id,
-            "created_at": booking.created_at,
-            "user": {
-                "id": booking.user.id,
-                "name": booking.user.name,
-                "email": booking.user.email
-            }
-        })
-    
-    return result
+    if organizer_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+
+    return StreamingResponse(
+        _stream_attendees(event_id, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="event-{event_id}-attendees.{format}"',
+            # Sent as it is read rather than held back by the compression middleware
+            "Content-Encoding": "identity",
+        },
+    )
+
+
+@router.get("/me/feed")
+async def get_my_feed_url(request: Request, current_user: User = Depends(get_current_user)):
+    """
+    URL of the user's iCalendar feed, for subscribing from a calendar app.
+    The token in it only grants access to the feed.
+    """
+    token = create_feed_token(current_user.id)
+    return {"token": token, "url": str(request.url_for("get_my_feed").include_query_params(token=token))}
+
+
+@router.get("/me.ics")
+async def get_my_feed(
+    token: str = Query(..., description="Feed token from GET /bookings/me/feed"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    # The primary, so a refill right after an invalidation can't come from a lagging replica
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    iCalendar feed of the events the user has RSVP'd to. Waitlisted RSVPs
+    are marked tentative.
+    """
+    user_id = int(decode_backend_token(token, FEED_TOKEN)["sub"])
+    return await calendar.feed_response(
+        user_feed_cache_namespace(user_id), if_none_match, if_modified_since, lambda: calendar.user_feed(db, user_id)
+    )
 
 
 @router.get("/me", response_model=List[BookingWithEvent])
-def get_my_rsvps(
-    db: Session = Depends(get_db),
+async def get_my_rsvps(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(read_session(per_user=True)),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get all RSVPs for the current user
     """
-    # Get all bookings for current user
-    bookings = db.query(Booking).filter(Booking.user_id == current_user.id).all()
-    
-    # Format response with event details
-    result = []
-    for booking in bookings:
-        result.append({
-            "id": booking.id,
-            "event_id": booking.event_id,
-            "created_at": booking.created_at,
+    after_id = decode_id_cursor(after)
+
+    def page_query(*columns):
+        query = (
+            select(*columns)
+            .join(Event, Event.id == Booking.event_id)
+            .where(Booking.user_id == current_user.id)
+        )
+        if after_id is not None:
+            query = query.where(Booking.id > after_id)
+        return query.order_by(Booking.id).limit(limit + 1)
+
+    def page_etag(rows, has_more):
+        return make_etag(
+            "rsvps", current_user.id, limit, after,
+            [(r.id, r.version, r.event_version) for r in rows], has_more,
+        )
+
+    if if_none_match:
+        # Revalidation: compare versions only, without loading or serializing the rows
+        probe = (await db.execute(page_query(Booking.id, Booking.version, Event.version.label("event_version")))).all()
+        has_more = len(probe) > limit
+        probe = probe[:limit]
+        etag = page_etag(probe, has_more)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, {NEXT_CURSOR_HEADER: encode_cursor(probe[-1].id)} if has_more else {})
+
+    # One JOIN per page instead of a lazy load of booking.event per row
+    rows = (
+        await db.execute(
+            page_query(
+                Booking.id,
+                Booking.user_id,
+                Booking.event_id,
+                Booking.status,
+                Booking.created_at,
+                Booking.version,
+                Event.title,
+                Event.description,
+                Event.date,
+                Event.location,
+                Event.organizer_id,
+                Event.version.label("event_version"),
+            )
+        )
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    headers = {ETAG_HEADER: page_etag(rows, has_more)}
+    if has_more:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+
+    body = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "event_id": row.event_id,
+            "status": row.status,
+            "created_at": row.created_at,
             "event": {
-                "id": booking.event.id,
-                "title": booking.event.title,
-                "description": booking.event.description,
-                "date": booking.event.date,
-                "location": booking.event.location,
-                "organizer_id": booking.event.organizer_id
-            }
-        })
-    
-    return result
+                "id": row.event_id,
+                "title": row.title,
+                "description": row.description,
+                "date": row.date,
+                "location": row.location,
+                "organizer_id": row.organizer_id,
+            },
+        }
+        for row in rows
+    ]
+    if FAST_JSON_RESPONSES:
+        # Serialized straight from the row tuples; response_model only documents the shape
+        return json_response(dump_json(body), headers)
+    response.headers.update(headers)
+    return body
@@ -1,67 +1,399 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.db.database import AsyncSessionLocal, get_async_db, get_async_write_db
+from app.db.replicas import mark_write, read_session
+from app.api.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_date_id_cursor,
+    decode_distance_id_cursor,
+    decode_id_cursor,
+    encode_cursor,
+)
+from app.api.etag import ETAG_HEADER, etag_matches, make_etag, not_modified
+from app.core.response_cache import (
+    EVENTS_LIST_CACHE,
+    cached_response,
+    dump_json,
+    event_cache_namespace,
+    event_feed_cache_namespace,
+    json_response,
+    response_cache,
+    user_feed_cache_namespace,
+)
+from app.core.pubsub import broker
 from app.core.security import get_current_user
+from app.services import calendar, geo, jobs, live, reservations, search
+from app.services.notifications import promoted_payload
 
+from models.booking import Booking
 from models.event import Event
-from schemas.event import EventCreate, EventOut, EventUpdate
+from schemas.event import EventCreate, EventOut, EventStats, EventUpdate, coordinates_error
 
 router = APIRouter()
 
+MAX_STATS_IDS = 500
+# Comment line sent on idle live streams so proxies don't close them
+LIVE_KEEPALIVE_SECONDS = 15
+NEARBY_MAX_RADIUS_KM = 500
+
 
 # CREATE EVENT
 @router.post("/create", response_model=EventOut)
-def create_event(event: EventCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+async def create_event(event: EventCreate, db: AsyncSession = Depends(get_async_write_db), current_user: dict = Depends(get_current_user)):
     new_event = Event(
         title=event.title,
         description=event.description,
         date=event.date,
+        capacity=event.capacity,
+        latitude=event.latitude,
+        longitude=event.longitude,
         organizer_id=current_user.id
     )
 
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
+    await db.flush()
+    await search.index_event(db, new_event)
+    await db.commit()
+    await mark_write(EVENTS_LIST_CACHE, f"user:{current_user.id}")
+    await db.refresh(new_event)
+    await response_cache.invalidate(EVENTS_LIST_CACHE)
     return new_event
 
 
-# GETting ALL EVENTS
+def _page_etag(cache_key: str, rows, has_more: bool) -> str:
+    return make_etag("events", cache_key, [(r.id, r.version) for r in rows], has_more)
+
+
+# GETting ALL EVENTS (keyset paginated on (date, id))
 @router.get("/all")
-def get_events(db: Session = Depends(get_db)):
+async def get_events(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    start: Optional[datetime] = Query(None, description="Only events on or after this date"),
+    end: Optional[datetime] = Query(None, description="Only events before this date"),
+    organizer_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(read_session(EVENTS_LIST_CACHE)),
+):
+    cursor = decode_date_id_cursor(after)
+    cache_key = f"{limit}|{after}|{start}|{end}|{organizer_id}"
+    cached, cache_version = await response_cache.get(EVENTS_LIST_CACHE, cache_key)
+    if cached is not None:
+        if etag_matches(if_none_match, cached["headers"].get(ETAG_HEADER)):
+            return not_modified(cached["headers"][ETAG_HEADER], cached["headers"])
+        return cached_response(cached)
+
+    def page_query(*columns):
+        query = select(*columns)
+        if organizer_id is not None:
+            query = query.where(Event.organizer_id == organizer_id)
+        if start is not None:
+            query = query.where(Event.date >= start)
+        if end is not None:
+            query = query.where(Event.date < end)
+        if cursor is not None:
+            last_date, last_id = cursor
+            query = query.where(
+                or_(Event.date > last_date, and_(Event.date == last_date, Event.id > last_id))
+            )
+        # Fetch one extra row to know whether another page exists
+        return query.order_by(Event.date, Event.id).limit(limit + 1)
+
     try:
-        events = db.query(Event).all()
-        result = []
-        for e in events:
-            result.append({
-                "id": e.id,
-                "title": e.title,
-                "description": e.description,
-                "date": e.date.isoformat() if e.date else None,
-                "location": getattr(e, "location", None),
-                "organizer_id": e.organizer_id,
-            })
-        return result
+        if if_none_match:
+            # Revalidation: compare versions only, without loading or serializing the rows
+            probe = (await db.execute(page_query(Event.id, Event.date, Event.version))).all()
+            has_more = len(probe) > limit
+            probe = probe[:limit]
+            etag = _page_etag(cache_key, probe, has_more)
+            if etag_matches(if_none_match, etag):
+                headers = {NEXT_CURSOR_HEADER: encode_cursor(probe[-1].date, probe[-1].id)} if has_more else {}
+                return not_modified(etag, headers)
+
+        rows = (
+            await db.execute(
+                page_query(
+                    Event.id,
+                    Event.title,
+                    Event.description,
+                    Event.date,
+                    Event.location,
+                    Event.organizer_id,
+                    Event.capacity,
+                    Event.attendee_count,
+                    Event.version,
+                )
+            )
+        ).all()
     except Exception as exc:
         # Return a generic error to the client and let server logs capture details
         raise HTTPException(status_code=500, detail=str(exc))
 
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    headers = {ETAG_HEADER: _page_etag(cache_key, rows, has_more)}
+    if has_more:
+        last = rows[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last.date, last.id)
+
+    body = dump_json([
+        {
+            "id": e.id,
+            "title": e.title,
+            "description": e.description,
+            "date": e.date.isoformat() if e.date else None,
+            "location": e.location,
+            "organizer_id": e.organizer_id,
+            "capacity": e.capacity,
+            "attendee_count": e.attendee_count,
+        }
+        for e in rows
+    ])
+    await response_cache.set(EVENTS_LIST_CACHE, cache_key, body, headers, cache_version)
+    return json_response(body, headers)
+
+
+# FULL-TEXT SEARCH (declared before /{event_id} so "search" isn't parsed as an id)
+@router.get("/search")
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    db: AsyncSession = Depends(read_session(EVENTS_LIST_CACHE)),
+):
+    # Ranked results page by offset; the cursor keeps that opaque to clients
+    offset = decode_id_cursor(after) or 0
+    rows = await search.search_events(
+        db, q, limit + 1, offset,
+        Event.id,
+        Event.title,
+        Event.description,
+        Event.date,
+        Event.location,
+        Event.organizer_id,
+        Event.capacity,
+        Event.attendee_count,
+    )
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(offset + limit)
+
+    return json_response(dump_json([
+        {
+            "id": e.id,
+            "title": e.title,
+            "description": e.description,
+            "date": e.date.isoformat() if e.date else None,
+            "location": e.location,
+            "organizer_id": e.organizer_id,
+            "capacity": e.capacity,
+            "attendee_count": e.attendee_count,
+            "rank": e.rank,
+        }
+        for e in rows
+    ]), headers)
+
+
+# EVENTS NEAR A POINT (declared before /{event_id} so "nearby" isn't parsed as an id)
+@router.get("/nearby")
+async def get_nearby_events(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=NEARBY_MAX_RADIUS_KM),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    start: Optional[datetime] = Query(None, description="Only events on or after this date"),
+    end: Optional[datetime] = Query(None, description="Only events before this date"),
+    db: AsyncSession = Depends(read_session(EVENTS_LIST_CACHE)),
+):
+    """Events within radius_km of (lat, lng), nearest first, each with its distance_km."""
+    filters = []
+    if start is not None:
+        filters.append(Event.date >= start)
+    if end is not None:
+        filters.append(Event.date < end)
+    page, has_more = await geo.nearby(db, lat, lng, radius_km, limit, decode_distance_id_cursor(after), filters)
+
+    headers = {}
+    if has_more:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(*page[-1])
+    rows = {}
+    if page:
+        rows = {
+            e.id: e
+            for e in (
+                await db.execute(
+                    select(
+                        Event.id,
+                        Event.title,
+                        Event.description,
+                        Event.date,
+                        Event.location,
+                        Event.latitude,
+                        Event.longitude,
+                        Event.organizer_id,
+                        Event.capacity,
+                        Event.attendee_count,
+                    ).where(Event.id.in_([event_id for _, event_id in page]))
+                )
+            ).all()
+        }
+
+    body = []
+    for distance, event_id in page:
+        e = rows.get(event_id)
+        if e is None:
+            # Deleted between the two queries
+            continue
+        body.append({
+            "id": e.id,
+            "title": e.title,
+            "description": e.description,
+            "date": e.date.isoformat() if e.date else None,
+            "location": e.location,
+            "latitude": e.latitude,
+            "longitude": e.longitude,
+            "organizer_id": e.organizer_id,
+            "capacity": e.capacity,
+            "attendee_count": e.attendee_count,
+            "distance_km": round(distance, 3),
+        })
+    return json_response(dump_json(body), headers)
+
+
+# ATTENDEE COUNTS FOR MANY EVENTS (declared before /{event_id} so "stats" isn't parsed as an id)
+@router.get("/stats", response_model=List[EventStats])
+async def get_event_stats(
+    ids: str = Query(..., description="Comma-separated event ids, e.g. 1,2,3"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        event_ids = {int(part) for part in ids.split(",") if part.strip()}
+    except ValueError:
+        raise HTTPException(400, "ids must be a comma-separated list of integers")
+    if len(event_ids) > MAX_STATS_IDS:
+        raise HTTPException(400, f"At most {MAX_STATS_IDS} ids per request")
+    if not event_ids:
+        return []
+
+    # One primary-key lookup for the whole batch; unknown ids are simply absent
+    rows = (
+        await db.execute(
+            select(Event.id, Event.attendee_count, Event.capacity).where(Event.id.in_(event_ids))
+        )
+    ).all()
+    return [
+        {
+            "id": row.id,
+            "attendee_count": row.attendee_count,
+            "capacity": row.capacity,
+            "seats_left": None if row.capacity is None else max(row.capacity - row.attendee_count, 0),
+        }
+        for row in rows
+    ]
+
+
+# ICALENDAR FEED (declared before /{event_id} so "5.ics" isn't parsed as an id)
+@router.get("/{event_id}.ics")
+async def get_event_feed(
+    event_id: int,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    db: AsyncSession = Depends(read_session("event:{event_id}")),
+):
+    async def render():
+        feed = await calendar.event_feed(db, event_id)
+        if feed is None:
+            raise HTTPException(404, "Event not found")
+        return feed
+
+    return await calendar.feed_response(event_feed_cache_namespace(event_id), if_none_match, if_modified_since, render)
+
 
 #to  get EVENT BY ID
 @router.get("/{event_id}", response_model=EventOut)
-def get_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).filter(Event.id == event_id).first()
+async def get_event(event_id: int, if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(read_session("event:{event_id}"))):
+    cached, cache_version = await response_cache.get(event_cache_namespace(event_id))
+    if cached is not None:
+        if etag_matches(if_none_match, cached["headers"].get(ETAG_HEADER)):
+            return not_modified(cached["headers"][ETAG_HEADER])
+        return cached_response(cached)
+
+    if if_none_match:
+        # Revalidation only needs the version column
+        version = await db.scalar(select(Event.version).where(Event.id == event_id))
+        if version is not None and etag_matches(if_none_match, make_etag("event", event_id, version)):
+            return not_modified(make_etag("event", event_id, version))
+
+    event = await db.get(Event, event_id)
 
     if not event:
         raise HTTPException(404, "Event not found")
 
-    return event
+    headers = {ETAG_HEADER: make_etag("event", event_id, event.version)}
+    body = dump_json(jsonable_encoder(EventOut.from_orm(event)))
+    await response_cache.set(event_cache_namespace(event_id), "", body, headers, cache_version)
+    return json_response(body, headers)
+
+
+async def _live_stream(subscription, initial: bytes):
+    yield b"data: " + initial + b"\n\n"
+    while True:
+        message = await subscription.get(timeout=LIVE_KEEPALIVE_SECONDS)
+        if message is None:
+            yield b": keepalive\n\n"
+            continue
+        yield b"data: " + message + b"\n\n"
+        # Messages are our own compact JSON (see live.publish_deleted)
+        if b'"deleted":true' in message:
+            return
+
+
+# LIVE ATTENDANCE (Server-Sent Events)
+@router.get("/{event_id}/live")
+async def watch_event(event_id: int):
+    """
+    Stream attendance as Server-Sent Events. The first message is the current
+    state; later ones follow every RSVP, cancellation or capacity change.
+    """
+    channel = live.live_channel(event_id)
+    # Subscribe before reading the state so no update falls in between
+    subscription = broker.subscribe(channel)
+    initial = broker.last(channel)
+    if initial is None:
+        # Not holding a session for the lifetime of the stream
+        async with AsyncSessionLocal() as db:
+            counts = await live.snapshot(db, event_id)
+        if counts is None:
+            subscription.close()
+            raise HTTPException(404, "Event not found")
+        initial = dump_json(counts)
+
+    return StreamingResponse(
+        _live_stream(subscription, initial),
+        media_type="text/event-stream",
+        # Content-Encoding makes the GZip/Brotli middleware pass the stream
+        # through; a compressor would hold messages back until its buffer fills
+        headers={"Cache-Control": "no-cache, no-transform", "Content-Encoding": "identity", "X-Accel-Buffering": "no"},
+        # Runs when the stream ends or the client disconnects
+        background=BackgroundTask(subscription.close),
+    )
 
 
 # UPDATE EVENT
 @router.put("/update/{event_id}", response_model=EventOut)
-def update_event(event_id: int, update: EventUpdate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    event = db.query(Event).filter(Event.id == event_id).first()
+async def update_event(event_id: int, update: EventUpdate, db: AsyncSession = Depends(get_async_write_db), current_user: dict = Depends(get_current_user)):
+    # Locked like an RSVP or cancellation, since a new capacity moves seats
+    event = await db.get(Event, event_id, with_for_update=True)
 
     if not event:
         raise HTTPException(404, "Event not found")
@@ -69,27 +401,63 @@ def update_event(event_id: int, update: EventUpdate, db: Session = Depends(get_d
     if event.organizer_id != current_user.id:
         raise HTTPException(403, "Not authorized")
 
-    event.title = update.title
-    event.description = update.description
-    event.date = update.date
+    previously_indexed = search.indexed_fields(event)
+    previous_calendar = calendar.calendar_fields(event)
+    # Only the fields the client sent; an omitted capacity must not lift the cap
+    for field, value in update.dict(exclude_unset=True).items():
+        setattr(event, field, value)
+    error = coordinates_error(event.latitude, event.longitude)
+    if error:
+        raise HTTPException(422, error)
+    calendar_changed = calendar.calendar_fields(event) != previous_calendar
+    if calendar_changed:
+        event.calendar_version = Event.calendar_version + 1
+        # Every attendee's feed lists this event
+        jobs.enqueue(db, "calendar.feeds_changed", {"event_id": event_id})
+    await db.flush()
+    await search.index_event(db, event, old=previously_indexed)
 
-    db.commit()
-    db.refresh(event)
+    # A larger (or removed) capacity frees seats for the waitlist
+    promoted = await reservations.promote_waitlist(db, event_id)
+    if promoted:
+        jobs.enqueue(db, "bookings.promoted", promoted_payload(promoted))
+
+    await db.commit()
+    await mark_write(EVENTS_LIST_CACHE, event_cache_namespace(event_id), f"user:{current_user.id}")
+    await db.refresh(event)
+    await response_cache.invalidate(
+        EVENTS_LIST_CACHE,
+        event_cache_namespace(event_id),
+        event_feed_cache_namespace(event_id),
+        *(user_feed_cache_namespace(b.user_id) for b in promoted),
+    )
+    await live.publish_counts(db, event_id)
     return event
 
 
 
 # DELETE EVENT
 @router.delete("/delete/{event_id}")
-def delete_event(event_id: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    event = db.query(Event).filter(Event.id == event_id).first()
+async def delete_event(event_id: int, db: AsyncSession = Depends(get_async_write_db), current_user: dict = Depends(get_current_user)):
+    event = await db.get(Event, event_id)
 
     if not event:
         raise HTTPException(404, "Event not found")
 
     if event.organizer_id != current_user.id:
         raise HTTPException(403, "Not authorized")
-    db.delete(event)
-    db.commit()
+    await search.unindex_event(db, event_id, search.indexed_fields(event))
+    # Bookings go with the event; their holders are told by a background job
+    attendees = (await db.scalars(select(Booking.user_id).where(Booking.event_id == event_id))).all()
+    await db.execute(delete(Booking).where(Booking.event_id == event_id).execution_options(synchronize_session=False))
+    await db.delete(event)
+    if attendees:
+        jobs.enqueue(db, "event.deleted", {"event_id": event_id, "title": event.title, "user_ids": attendees})
+        # The bookings are gone by the time the job runs, so it gets the users
+        jobs.enqueue(db, "calendar.feeds_changed", {"user_ids": attendees})
+    await db.commit()
+    await mark_write(EVENTS_LIST_CACHE, event_cache_namespace(event_id), f"user:{current_user.id}")
+    await response_cache.invalidate(EVENTS_LIST_CACHE, event_cache_namespace(event_id), event_feed_cache_namespace(event_id))
+    await live.publish_deleted(event_id)
 
     return {"message": "Event deleted successfully"}
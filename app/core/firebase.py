@@ -1,28 +1,214 @@
+# The one Firebase module: app initialization, cert caching and ID token
+# verification. Nothing here touches firebase_admin until the first token is
+# verified, so importing the app stays fast and workers boot without reading
+# the service account.
+
+import hashlib
+import json
+import logging
 import os
-import firebase_admin
-from firebase_admin import credentials, auth
+import re
+import threading
+import time
+
 from fastapi import HTTPException
 
-# Initialize Firebase app only if service account key exists
-FIREBASE_AVAILABLE = False
-if os.path.exists("serviceAccountKey.json"):
+from app.core.cache import TTLCache
+from app.core.metrics import FIREBASE_TOKEN_CACHE, FIREBASE_VERIFY_LATENCY
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_SERVICE_ACCOUNT_PATH = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH", "serviceAccountKey.json")
+# Google publishes the Firebase ID token signing certs here. Point it at a local
+# server (e.g. `python -m http.server`) to verify tokens without network access.
+FIREBASE_CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL", "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+# Refresh the certs this many seconds before Google says they expire.
+CERT_REFRESH_MARGIN = int(os.getenv("FIREBASE_CERT_REFRESH_MARGIN", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("FIREBASE_TOKEN_CACHE_SIZE", "10000"))
+# Reject tokens of disabled users or issued before a revocation. Costs a
+# user lookup per verification; cached tokens are not re-checked before exp.
+FIREBASE_CHECK_REVOKED = os.getenv("FIREBASE_CHECK_REVOKED", "false").strip().lower() in ("1", "true", "yes", "on")
+# Only accept ID tokens of this Identity Platform tenant
+FIREBASE_TENANT_ID = os.getenv("FIREBASE_TENANT_ID") or None
+ID_TOKEN_ISSUER_PREFIX = "https://securetoken.google.com/"
+
+
+class _CertResponse:
+    """Minimal google.auth.transport.Response for the cached certs."""
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class CertStore:
+    """
+    Keeps the Firebase signing certs in memory and refreshes them in the
+    background ahead of their Cache-Control expiry, so no request ever waits
+    on a cert download. Used as the google-auth transport by FirebaseVerifier.
+    """
+
+    def __init__(self, url: str = FIREBASE_CERTS_URL, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.fetches = 0
+        self._body = None
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def refresh(self):
+        import requests
+
+        resp = requests.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        json.loads(resp.content)  # refuse to cache a body we can't parse
+        match = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        with self._lock:
+            self._body = resp.content
+            self.expires_at = time.time() + max_age
+            self.fetches += 1
+
+    def _prefetch_loop(self):
+        while True:
+            try:
+                self.refresh()
+                delay = max(self.expires_at - time.time() - CERT_REFRESH_MARGIN, 30)
+            except Exception:
+                logger.warning("Failed to prefetch Firebase certs from %s", self.url, exc_info=True)
+                delay = 30
+            time.sleep(delay)
+
+    def start(self):
+        """Start the background refresher (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch_loop, name="firebase-certs", daemon=True)
+            self._thread.start()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if url != self.url:
+            import requests
+
+            resp = requests.request(method, url, data=body, headers=headers, timeout=timeout or self.timeout)
+            return _CertResponse(resp.status_code, resp.headers, resp.content)
+        if self._body is None or self.expires_at <= time.time():
+            # Only reached if the background refresher hasn't run yet or is failing
+            self.refresh()
+        return _CertResponse(200, {}, self._body)
+
+
+class FirebaseVerifier:
+    """
+    Verifies Firebase ID tokens for one project using only public APIs.
+
+    Signature, expiry and audience are checked by google-auth's verify_token
+    against the certs held by `certs`, so no request waits on a download.
+    The checks firebase_admin.auth.verify_id_token adds on top (issuer,
+    subject and, when configured, tenant) are repeated here. Revocation needs
+    a user lookup per token, so with `check_revoked` tokens go through
+    firebase_admin's own verify_id_token instead.
+    """
+
+    def __init__(self, project_id: str, certs: CertStore, app=None, check_revoked: bool = False, tenant_id: str = None):
+        self.project_id = project_id
+        self.certs = certs
+        self.app = app
+        self.check_revoked = check_revoked
+        self.tenant_id = tenant_id
+
+    def verify_id_token(self, id_token: str) -> dict:
+        if self.check_revoked:
+            from firebase_admin import auth, tenant_mgt
+
+            if self.tenant_id:
+                client = tenant_mgt.auth_for_tenant(self.tenant_id, app=self.app)
+                return client.verify_id_token(id_token, check_revoked=True)
+            return auth.verify_id_token(id_token, app=self.app, check_revoked=True)
+
+        from google.oauth2 import id_token as google_id_token
+
+        claims = google_id_token.verify_token(id_token, self.certs, audience=self.project_id, certs_url=self.certs.url)
+        if claims.get("iss") != ID_TOKEN_ISSUER_PREFIX + self.project_id:
+            raise ValueError(f"Unexpected issuer {claims.get('iss')!r}")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise ValueError("Missing or invalid subject")
+        if self.tenant_id and claims.get("firebase", {}).get("tenant") != self.tenant_id:
+            raise ValueError("Token belongs to another tenant")
+        claims["uid"] = subject
+        return claims
+
+
+cert_store = CertStore()
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+_verifier = None
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def _create_verifier():
+    if not os.path.exists(FIREBASE_SERVICE_ACCOUNT_PATH):
+        return None
+    import firebase_admin
+    from firebase_admin import credentials
+
     try:
-        cred = credentials.Certificate("serviceAccountKey.json")
-        firebase_admin.initialize_app(cred)
-        FIREBASE_AVAILABLE = True
+        app = firebase_admin.initialize_app(credentials.Certificate(FIREBASE_SERVICE_ACCOUNT_PATH))
     except Exception:
-        FIREBASE_AVAILABLE = False
+        logger.exception("Failed to initialize Firebase from %s", FIREBASE_SERVICE_ACCOUNT_PATH)
+        return None
+    if not app.project_id:
+        logger.error("The Firebase service account in %s has no project_id", FIREBASE_SERVICE_ACCOUNT_PATH)
+        return None
+    cert_store.start()
+    return FirebaseVerifier(
+        app.project_id, cert_store, app=app, check_revoked=FIREBASE_CHECK_REVOKED, tenant_id=FIREBASE_TENANT_ID
+    )
+
+
+def get_verifier():
+    """The token verifier, initializing Firebase on first use. None if not configured."""
+    global _verifier, _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                _verifier = _create_verifier()
+                _initialized = True
+    return _verifier
+
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
 
 
 def verify_firebase_token(id_token: str):
     """
     Verify Firebase ID token and return decoded user info.
+    Successful verifications are cached until the token's `exp`.
     Raises HTTPException if Firebase is not configured or token invalid.
     """
-    if not FIREBASE_AVAILABLE:
+    verifier = get_verifier()
+    if verifier is None:
         raise HTTPException(status_code=503, detail="Firebase not configured on server")
 
+    key = _token_key(id_token)
+    decoded = token_cache.get(key)
+    if decoded is not None:
+        FIREBASE_TOKEN_CACHE.labels("hit").inc()
+        return decoded
+    FIREBASE_TOKEN_CACHE.labels("miss").inc()
+
+    started = time.perf_counter()
     try:
-        return auth.verify_id_token(id_token)
+        decoded = verifier.verify_id_token(id_token)
     except Exception:
+        FIREBASE_VERIFY_LATENCY.labels("invalid").observe(time.perf_counter() - started)
         raise HTTPException(status_code=401, detail="Invalid Firebase token")
+    FIREBASE_VERIFY_LATENCY.labels("ok").observe(time.perf_counter() - started)
+
+    token_cache.set(key, decoded, expires_at=decoded.get("exp"))
+    return decoded
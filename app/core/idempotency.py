@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response
+
+from app.core.kvstore import create_store
+from app.core.response_cache import RESPONSE_CACHE_URL, dump_json, json_response
+
+# Responses to requests sent with an Idempotency-Key header are kept this long
+# so client retries get the original answer instead of running the write again.
+# Shares the response cache backend by default; without a redis:// URL keys
+# are only remembered by the worker that saw them.
+IDEMPOTENCY_STORE_URL = os.getenv("IDEMPOTENCY_STORE_URL", RESPONSE_CACHE_URL)
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_STORE_SIZE = int(os.getenv("IDEMPOTENCY_STORE_SIZE", "10000"))
+# How long a key stays locked while its first request is running
+IN_PROGRESS_TTL = 60
+MAX_KEY_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+_PENDING = b"pending"
+
+
+class IdempotencyStore:
+    """
+    Remembers successful (2xx) JSON responses by (scope, key).
+
+    The first request claims the key with an NX write, so concurrent retries
+    get a 409 instead of running twice. Failed requests release the key, and
+    a reused key with a different payload is rejected with 422.
+    """
+
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+
+    async def run(self, scope: str, key: Optional[str], payload, call: Callable[[], Awaitable[Response]]) -> Response:
+        if not key:
+            return await call()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        store_key = f"idem:{scope}:{key}"
+        fingerprint = hashlib.sha256(dump_json(payload)).hexdigest()
+
+        if not await self.store.set(store_key, _PENDING, ttl=IN_PROGRESS_TTL, nx=True):
+            return await self._replay(store_key, fingerprint)
+
+        try:
+            response = await call()
+        except BaseException:
+            await self.store.delete(store_key)
+            raise
+        if 200 <= response.status_code < 300:
+            entry = {"fingerprint": fingerprint, "status": response.status_code, "body": response.body.decode()}
+            await self.store.set(store_key, json.dumps(entry).encode(), ttl=self.ttl)
+        else:
+            await self.store.delete(store_key)
+        return response
+
+    async def _replay(self, store_key: str, fingerprint: str) -> Response:
+        raw = await self.store.get(store_key)
+        if raw is None or raw == _PENDING:
+            raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+        entry = json.loads(raw)
+        if entry["fingerprint"] != fingerprint:
+            raise HTTPException(422, "Idempotency-Key was already used with a different request")
+        return json_response(entry["body"].encode(), {REPLAYED_HEADER: "true"}, status_code=entry["status"])
+
+
+idempotency_store = IdempotencyStore(create_store(IDEMPOTENCY_STORE_URL, maxsize=IDEMPOTENCY_STORE_SIZE), IDEMPOTENCY_TTL)
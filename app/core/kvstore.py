@@ -0,0 +1,141 @@
+import asyncio
+import time
+from typing import Optional
+
+from app.core.cache import TTLCache
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is only needed when a redis:// URL is configured
+    aioredis = None
+
+# URL schemes that select a real Redis server
+REDIS_SCHEMES = ("redis://", "rediss://", "unix://")
+
+
+def redis_client(url: str, setting: str):
+    """
+    A redis.asyncio client for `url`. Every Redis-backed component (stores,
+    rate limits, pub/sub) gets its client here; `setting` names the URL for
+    the error raised when the redis package isn't installed.
+    """
+    if aioredis is None:
+        raise RuntimeError(f"The 'redis' package is required for a redis:// {setting}")
+    return aioredis.from_url(url)
+
+
+class MemoryStore:
+    """
+    Per-process key/value store. Values and counters live in separate LRUs
+    of `maxsize` entries each, so a burst of values can't evict the counters.
+    An evicted counter reads as missing, like an expired key in Redis.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self._values = TTLCache(maxsize=maxsize)
+        self._counters = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        counter = self._counters.get(key)
+        if counter is not None:
+            return str(counter).encode()
+        return self._values.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        if nx and await self.get(key) is not None:
+            return False
+        self._values.set(key, value, expires_at=time.time() + ttl if ttl else None)
+        return True
+
+    async def incr(self, key: str) -> int:
+        current = self._counters.get(key)
+        if current is None:
+            stored = self._values.get(key)
+            current = int(stored) if stored is not None else 0
+            self._values.delete(key)
+        self._counters.set(key, current + 1)
+        return current + 1
+
+    async def delete(self, key: str) -> None:
+        self._counters.delete(key)
+        self._values.delete(key)
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the subset of the redis.asyncio client API the
+    stores use (get/set with ex+nx, incr, delete). Select it with a
+    `fakeredis://` URL to exercise the shared-store code path locally.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = asyncio.Lock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        async with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            if isinstance(value, (int, str)):
+                value = str(value).encode()
+            self._data[key] = (value, time.time() + ex if ex else None)
+            return True
+
+    async def incr(self, key):
+        async with self._lock:
+            current = self._live(key)
+            value = int(current or 0) + 1
+            expires_at = self._data[key][1] if current is not None else None
+            self._data[key] = (str(value).encode(), expires_at)
+            return value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class RedisStore:
+    """Shared store backed by a redis.asyncio client (or FakeRedis)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        ex = max(int(ttl), 1) if ttl else None
+        return bool(await self.client.set(key, value, ex=ex, nx=nx))
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+
+def create_store(url: Optional[str], maxsize: int = 1024):
+    """
+    Build a store from a URL: empty / "memory://" for the per-process store,
+    "fakeredis://" for the local fake, or any redis:// / rediss:// URL.
+    """
+    if not url or url.startswith("memory://"):
+        return MemoryStore(maxsize=maxsize)
+    if url.startswith("fakeredis://"):
+        return RedisStore(FakeRedis())
+    if url.startswith(REDIS_SCHEMES):
+        return RedisStore(redis_client(url, "store URL"))
+    raise ValueError(f"Unsupported store URL: {url}")
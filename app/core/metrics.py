@@ -0,0 +1,178 @@
+import contextvars
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# Under gunicorn every worker writes its samples to files in this directory
+# (gunicorn.conf.py sets it up) and /metrics aggregates them. Without it the
+# metrics are per-process, which is right for a single uvicorn.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Requests that matched no route share one label so bad URLs can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "eventease_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "eventease_http_request_duration_seconds", "Time to serve a request, body included",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge(
+    "eventease_http_requests_in_progress", "Requests being served", ["method"], multiprocess_mode="livesum"
+)
+REQUEST_QUERIES = Histogram(
+    "eventease_db_queries_per_request", "SQL statements executed per request", ["route"], buckets=COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "eventease_db_time_per_request_seconds", "Time spent in SQL per request", ["route"], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Counter("eventease_db_queries_total", "SQL statements executed", ["engine"])
+DB_QUERY_LATENCY = Histogram(
+    "eventease_db_query_duration_seconds", "SQL statement execution time", ["engine"], buckets=QUERY_BUCKETS
+)
+DB_POOL_WAIT = Histogram(
+    "eventease_db_pool_checkout_seconds", "Time to get a connection from the pool", ["engine"], buckets=QUERY_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "eventease_db_pool_checked_out", "Connections currently checked out", ["engine"], multiprocess_mode="livesum"
+)
+FIREBASE_VERIFY_LATENCY = Histogram(
+    "eventease_firebase_verify_duration_seconds", "Firebase ID token verification time (cache misses)",
+    ["result"], buckets=LATENCY_BUCKETS,
+)
+FIREBASE_TOKEN_CACHE = Counter("eventease_firebase_token_cache_total", "Firebase token cache lookups", ["result"])
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request; the engine hooks add to it
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+
+def instrument_engine(engine, name: str) -> None:
+    """
+    Count statements, SQL time and pool checkout time for `engine`
+    (pass `async_engine.sync_engine` for an async engine).
+    """
+    queries = DB_QUERIES.labels(name)
+    latency = DB_QUERY_LATENCY.labels(name)
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started_at", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        queries.inc()
+        latency.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.pool, "checkout", lambda *args: checked_out.inc())
+    event.listen(engine.pool, "checkin", lambda *args: checked_out.dec())
+
+    # The pool has no "before checkout" event, so time the call that hands out
+    # connections. That includes opening a new one when the pool isn't full.
+    pool = engine.pool
+    do_get = pool._do_get
+    wait = DB_POOL_WAIT.labels(name)
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+
+
+def _route_path(scope) -> str:
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return UNMATCHED_ROUTE
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts, latency, in-flight requests
+    and per-request SQL usage. Routes are labelled by their path template
+    (e.g. /events/{event_id}), not the raw URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_stats.reset(token)
+            endpoint = scope.get("endpoint")
+            route = self._paths.get(endpoint)
+            if route is None:
+                route = _route_path(scope)
+                if endpoint is not None:
+                    self._paths[endpoint] = route
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_TIME.labels(route).observe(stats.db_time)
+
+
+def render_metrics():
+    """Return (body, content type) in the Prometheus text format."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,49 @@
+import asyncio
+import base64
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt cost factor; each +1 doubles the time per hash (~250ms at 12)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads reserved for hashing. bcrypt releases the GIL, so these run in
+# parallel without blocking the event loop, and a burst of logins can't take
+# over the threadpool that sync routes run in.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def _prepare(password: str) -> bytes:
+    # bcrypt only looks at the first 72 bytes (and bcrypt>=5 rejects longer
+    # input), so longer passwords are reduced to a fixed-size digest first.
+    raw = password.encode("utf-8")
+    if len(raw) > 72:
+        raw = base64.b64encode(hashlib.sha256(raw).digest())
+    return raw
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(_prepare(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("ascii")
+
+
+def _verify(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(_prepare(password), hashed.encode("ascii"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, _hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_executor, _verify, password, hashed)
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False)
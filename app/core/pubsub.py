@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from app.core.kvstore import REDIS_SCHEMES, redis_client
+from app.core.response_cache import RESPONSE_CACHE_URL
+
+logger = logging.getLogger(__name__)
+
+# PUBSUB_URL picks how messages reach other workers: unset / memory:// keeps
+# them in this process, redis://... relays them through Redis PUBLISH so a
+# change made on one worker reaches watchers connected to any worker.
+PUBSUB_URL = os.getenv("PUBSUB_URL", RESPONSE_CACHE_URL)
+# Messages buffered per subscriber; slow consumers lose the oldest ones
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "16"))
+
+
+class Subscription:
+    def __init__(self, broker, channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, message: bytes) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Next message, or None if `timeout` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process fan-out. Each channel remembers its last message so new
+    subscribers can start from the latest state without a database query.
+    Also the stand-in for a real broker in development.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._last = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.channel)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+                self._last.pop(subscription.channel, None)
+
+    def wants(self, channel: str) -> bool:
+        """Whether a publish on `channel` could reach anyone."""
+        return channel in self._subscribers
+
+    def last(self, channel: str) -> Optional[bytes]:
+        return self._last.get(channel)
+
+    def deliver(self, channel: str, message: bytes) -> None:
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+        self._last[channel] = message
+        for subscription in subscribers:
+            subscription.put(message)
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        self.deliver(channel, message)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes through Redis and delivers locally from one pattern subscription
+    per worker, so any number of local watchers share a single connection.
+    """
+
+    def __init__(self, client, pattern: str = "*"):
+        super().__init__()
+        self.client = client
+        self.pattern = pattern
+        self._task = None
+
+    def wants(self, channel: str) -> bool:
+        # Watchers may be connected to other workers
+        return True
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        await self.client.publish(channel, message)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                await pubsub.psubscribe(self.pattern)
+                async for item in pubsub.listen():
+                    if item["type"] == "pmessage":
+                        channel = item["channel"]
+                        self.deliver(channel.decode() if isinstance(channel, bytes) else channel, item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Redis pub/sub connection lost; reconnecting", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def create_broker(url: Optional[str]):
+    """
+    Build a broker from a URL: empty / "memory://" / "fakeredis://" for the
+    in-process broker, or any redis:// / rediss:// URL.
+    """
+    if not url or url.startswith(("memory://", "fakeredis://")):
+        return LocalBroker()
+    if url.startswith(REDIS_SCHEMES):
+        return RedisBroker(redis_client(url, "pub/sub URL"), pattern="event:*:live")
+    raise ValueError(f"Unsupported pub/sub URL: {url}")
+
+
+broker = create_broker(PUBSUB_URL)
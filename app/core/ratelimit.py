@@ -0,0 +1,148 @@
+import math
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request
+
+from app.core.kvstore import REDIS_SCHEMES, redis_client
+from app.core.response_cache import RESPONSE_CACHE_URL
+from app.core.security import get_current_user
+
+# Token-bucket limits per route group, as "<group>=<requests>/<seconds>".
+# A group allows bursts of <requests> and refills at <requests>/<seconds> per
+# second. RATE_LIMITS entries override the defaults; "<group>=off" disables one.
+DEFAULT_RATE_LIMITS = "auth=10/60,bookings=60/60"
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+# Where buckets live: unset for per-process buckets (each worker allows the
+# full rate), redis://... to share them between workers.
+RATE_LIMIT_STORE_URL = os.getenv("RATE_LIMIT_STORE_URL", RESPONSE_CACHE_URL)
+RATE_LIMIT_STORE_SIZE = int(os.getenv("RATE_LIMIT_STORE_SIZE", "100000"))
+
+
+def parse_limits(spec: str) -> dict:
+    """Parse "auth=10/60,bookings=60/60" into {group: (rate per second, burst)}."""
+    limits = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        group, _, rule = entry.strip().partition("=")
+        if rule.strip().lower() == "off":
+            limits[group] = None
+            continue
+        try:
+            requests, seconds = rule.split("/")
+            burst, period = int(requests), float(seconds)
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{entry}', expected <group>=<requests>/<seconds>")
+        limits[group] = (burst / period, burst)
+    return limits
+
+
+RATE_LIMITS = {**parse_limits(DEFAULT_RATE_LIMITS), **parse_limits(os.getenv("RATE_LIMITS", ""))}
+
+
+class MemoryBuckets:
+    """Per-process buckets in a bounded LRU; one dict lookup per request."""
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Same algorithm as MemoryBuckets, run atomically inside Redis
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local last = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - last, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Buckets shared by every worker, one script call per request."""
+
+    def __init__(self, client):
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._take(keys=[f"rl:{key}"], args=[rate, burst, time.time()]))
+
+
+def create_buckets(url: str):
+    if not url or url.startswith(("memory://", "fakeredis://")):
+        return MemoryBuckets(maxsize=RATE_LIMIT_STORE_SIZE)
+    if url.startswith(REDIS_SCHEMES):
+        return RedisBuckets(redis_client(url, "rate limit store"))
+    raise ValueError(f"Unsupported rate limit store URL: {url}")
+
+
+buckets = create_buckets(RATE_LIMIT_STORE_URL)
+
+
+async def _check(group: str, key: str) -> None:
+    rate, burst = RATE_LIMITS[group]
+    wait = await buckets.take(f"{group}:{key}", rate, burst)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+async def _no_limit():
+    return None
+
+
+def limit_by_ip(group: str):
+    """Dependency limiting `group` per client IP (for routes without a user)."""
+    if not RATE_LIMIT_ENABLED or not RATE_LIMITS.get(group):
+        return _no_limit
+
+    async def dependency(request: Request):
+        await _check(group, request.client.host if request.client else "unknown")
+
+    return dependency
+
+
+def limit_by_user(group: str):
+    """
+    Dependency limiting `group` per authenticated user. FastAPI runs
+    get_current_user once per request, so this adds no extra verification.
+    """
+    if not RATE_LIMIT_ENABLED or not RATE_LIMITS.get(group):
+        return _no_limit
+
+    async def dependency(current_user=Depends(get_current_user)):
+        await _check(group, f"user:{current_user.id}")
+
+    return dependency
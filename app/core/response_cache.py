@@ -0,0 +1,133 @@
+import json
+import os
+import time
+from typing import Optional
+
+from fastapi import Response
+
+from app.core.kvstore import create_store
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+# Opt-in fast path for large lists: the attendee and RSVP lists skip
+# response_model validation, and dump_json encodes with orjson if installed.
+# The JSON is the same either way (benchmarks/serialization.py checks).
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# RESPONSE_CACHE_URL picks the backend: unset for a per-process LRU,
+# redis://... to share entries and versions between gunicorn workers, or
+# fakeredis:// for the in-memory stand-in.
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+# Upper bound on how long any worker can serve a response after it changed.
+# With a shared backend invalidation is immediate; with the per-process
+# backend other workers only notice once their entry expires.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_ENABLED = RESPONSE_CACHE_TTL > 0
+
+# Namespaces shared by the routes that fill and invalidate them
+EVENTS_LIST_CACHE = "events:list"
+
+
+def event_cache_namespace(event_id: int) -> str:
+    return f"event:{event_id}"
+
+
+# Calendar feeds change less often than the JSON bodies above (RSVPs don't
+# touch an event's feed), so they get namespaces of their own
+def event_feed_cache_namespace(event_id: int) -> str:
+    return f"event:{event_id}:ics"
+
+
+def user_feed_cache_namespace(user_id: int) -> str:
+    return f"user:{user_id}:ics"
+
+
+class ResponseCache:
+    """
+    Caches serialized JSON bodies under versioned namespaces.
+
+    Every namespace (e.g. "events:list", "event:42") has a version number in
+    the store, and entries are keyed by "<namespace>:<version>:<key>". Writers
+    bump the version instead of hunting down keys, which invalidates every
+    entry of that namespace at once. Missing versions are seeded from the
+    clock, so an evicted counter can never bring old entries back.
+    """
+
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+
+    async def _version(self, namespace: str) -> str:
+        vkey = f"v:{namespace}"
+        version = await self.store.get(vkey)
+        if version is None:
+            await self.store.set(vkey, str(time.time_ns() // 1000).encode(), nx=True)
+            version = await self.store.get(vkey)
+        return version.decode() if isinstance(version, bytes) else str(version)
+
+    async def get(self, namespace: str, key: str = "") -> tuple:
+        """
+        Return (entry, version): the cached entry or None, and the namespace
+        version it was looked up under. Pass that version to set() when
+        filling a miss. If the namespace is invalidated while the body is
+        being rendered, the body is then stored under the old version, where
+        nobody looks, rather than under the new one.
+        """
+        if not RESPONSE_CACHE_ENABLED:
+            return None, None
+        version = await self._version(namespace)
+        raw = await self.store.get(f"{namespace}:{version}:{key}")
+        if raw is None:
+            return None, version
+        return load_json(raw), version
+
+    async def set(
+        self, namespace: str, key: str, body: bytes, headers: Optional[dict], version: str, ttl: float = None
+    ) -> None:
+        """Store a body under the version get() returned; `ttl` overrides the cache's default."""
+        if not RESPONSE_CACHE_ENABLED or version is None:
+            return
+        entry = dump_json({"body": body.decode(), "headers": headers or {}})
+        await self.store.set(f"{namespace}:{version}:{key}", entry, ttl=ttl or self.ttl)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            if await self.store.get(f"v:{namespace}") is not None:
+                await self.store.incr(f"v:{namespace}")
+
+
+def json_response(body: bytes, headers: Optional[dict] = None, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def cached_response(entry: dict) -> Response:
+    return json_response(entry["body"].encode(), entry["headers"])
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dump_json(data) -> bytes:
+    """
+    Serialize to compact JSON bytes. Datetimes become ISO 8601 strings.
+    Uses orjson when FAST_JSON_RESPONSES is on and it is installed.
+    """
+    if FAST_JSON_RESPONSES and orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), default=_json_default).encode()
+
+
+def load_json(raw):
+    if FAST_JSON_RESPONSES and orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+response_cache = ResponseCache(create_store(RESPONSE_CACHE_URL, maxsize=RESPONSE_CACHE_SIZE), RESPONSE_CACHE_TTL)
@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta
-from jose import jwt
+import os
+import time
+import jwt
+from datetime import datetime
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
@@ -7,22 +9,112 @@ from fastapi.security import HTTPBearer
 from types import SimpleNamespace
 from app.core import firebase as firebase_core
 
-# JWT settings (used only if you want backend-issued tokens)
-SECRET_KEY = "supersecretkey123"
+# Backend-issued JWTs. Clients trade a Firebase ID token for an access/refresh
+# pair at /auth/exchange (or log in with a password), and authenticated routes
+# then only need an HMAC check instead of a Firebase verification.
+#
+# JWT_KEYS is a comma-separated key ring of "kid:secret" pairs. New tokens are
+# signed with JWT_ACTIVE_KID (default: the first key); every key in the ring
+# is accepted. To rotate, put a new key first, keep the old one until its
+# last refresh token has expired, then drop it.
+# Without JWT_KEYS, JWT_SECRET is used as a single key. With neither set the
+# app refuses to start rather than sign tokens with a guessable secret.
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TTL_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TTL_DAYS", "7"))
+# Calendar apps keep the feed URL for as long as the user stays subscribed
+FEED_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_FEED_TTL_DAYS", "365"))
 
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+FEED_TOKEN = "feed"
 
-def create_access_token(data: dict):
+
+def _load_key_ring() -> dict:
+    raw = os.getenv("JWT_KEYS", "")
+    if not raw.strip():
+        secret = os.getenv("JWT_SECRET", "")
+        if not secret:
+            raise RuntimeError("Set JWT_KEYS or JWT_SECRET to sign backend tokens")
+        return {"default": secret}
+    ring = {}
+    for entry in raw.split(","):
+        kid, sep, secret = entry.strip().partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("JWT_KEYS entries must look like 'kid:secret'")
+        ring[kid] = secret
+    return ring
+
+
+KEY_RING = _load_key_ring()
+ACTIVE_KID = os.getenv("JWT_ACTIVE_KID") or next(iter(KEY_RING))
+if ACTIVE_KID not in KEY_RING:
+    raise ValueError(f"JWT_ACTIVE_KID '{ACTIVE_KID}' is not in JWT_KEYS")
+
+
+def _encode(claims: dict, token_type: str, ttl: int) -> tuple:
+    now = int(time.time())
+    payload = {**claims, "typ": token_type, "iat": now, "exp": now + ttl}
+    token = jwt.encode(payload, KEY_RING[ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": ACTIVE_KID})
+    return token, payload["exp"]
+
+
+def create_token_pair(user, uid: str = None) -> dict:
+    """
+    Issue a short-lived access token and a longer-lived refresh token for a
+    user row (anything with id, email and name).
+    """
+    claims = {"sub": str(user.id), "email": user.email, "name": user.name}
+    if uid:
+        claims["uid"] = uid
+    access_token, expires_at = _encode(claims, ACCESS_TOKEN, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    refresh_token, _ = _encode(claims, REFRESH_TOKEN, REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_at": datetime.utcfromtimestamp(expires_at).isoformat(),
+    }
+
+
+def create_feed_token(user_id: int) -> str:
     """
-    Create a backend JWT token with expiration.
-    Useful only if you want extra backend-only access tokens.
+    Long-lived token that only grants read access to the user's calendar
+    feed; it goes in the feed URL because calendar apps can't send headers.
     """
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    token, _ = _encode({"sub": str(user_id)}, FEED_TOKEN, FEED_TOKEN_EXPIRE_DAYS * 86400)
+    return token
+
+
+def backend_key_id(token: str):
+    """
+    Return the kid of a token signed with our key ring, or None for anything
+    else (e.g. a Firebase ID token). Only parses the header.
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.PyJWTError:
+        return None
+    return kid if kid in KEY_RING else None
+
+
+def decode_backend_token(token: str, token_type: str = ACCESS_TOKEN) -> dict:
+    """
+    Verify a backend-issued token of the given type and return its claims.
+    Raises HTTPException(401) if it is invalid, expired or of the wrong type.
+    """
+    kid = backend_key_id(token)
+    if kid is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    try:
+        claims = jwt.decode(token, KEY_RING[kid], algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if claims.get("typ") != token_type:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Wrong token type")
+    return claims
 
 
 # Authentication scheme to extract Bearer tokens
@@ -31,11 +123,18 @@ auth_scheme = HTTPBearer()
 
 def get_current_user(token: str = Depends(auth_scheme)):
     """
-    Extract Firebase ID token from the Authorization header,
-    verify it, and return decoded user information.
+    Accept a backend access token (verified locally) or a Firebase ID token,
+    and return the user as a lightweight object.
     """
+    credentials = token.credentials
+
+    # Fast path: our own tokens carry a kid from the key ring
+    if backend_key_id(credentials) is not None:
+        claims = decode_backend_token(credentials)
+        return SimpleNamespace(id=int(claims["sub"]), uid=claims.get("uid"), email=claims.get("email"), name=claims.get("name", "Unknown"))
+
     try:
-        id_token = token.credentials
+        id_token = credentials
 
         # Verify Firebase ID token via the app-level firebase helper
         decoded_token = firebase_core.verify_firebase_token(id_token)
@@ -1,7 +1,17 @@
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine
+import weakref
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.core.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
 # Allow DATABASE_URL to be provided by the environment (e.g. Render Postgres).
 # If not set, fall back to a local SQLite file for development.
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./eventease.db")
@@ -11,14 +21,116 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./eventease.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Async drivers used by the event and booking routes
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Swap the driver of a sync database URL for its asyncio counterpart,
+    e.g. postgresql://... -> postgresql+asyncpg://...
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+# ASYNC_DATABASE_URL can override the derived URL (e.g. to pick another driver)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Connection pool settings. They apply to each engine separately, and every
+# worker process has two engines (sync + async), so the connections a
+# deployment can open are:
+#     workers * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# Set DB_MAX_CONNECTIONS to the share of the Postgres max_connections this
+# service may use and the pool is shrunk to fit WEB_CONCURRENCY workers.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# How long a SQLite write waits for another connection to release the lock
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+if DB_MAX_CONNECTIONS:
+    per_engine = max(DB_MAX_CONNECTIONS // (WEB_CONCURRENCY * 2), 1)
+    if DB_POOL_SIZE + DB_MAX_OVERFLOW > per_engine:
+        logger.warning(
+            "Shrinking DB pool to %s connections per engine to stay within DB_MAX_CONNECTIONS=%s across %s workers",
+            per_engine, DB_MAX_CONNECTIONS, WEB_CONCURRENCY,
+        )
+        DB_POOL_SIZE = min(DB_POOL_SIZE, per_engine)
+        DB_MAX_OVERFLOW = per_engine - DB_POOL_SIZE
+
+
+def _engine_kwargs(driver: str) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine.
+    `driver` is "sync" or "async"; it only matters for driver-specific connect args.
+    """
+    if IS_SQLITE:
+        # SQLite pools are per-file and cheap; only the sync driver needs this flag
+        return {"connect_args": {"check_same_thread": False}} if driver == "sync" else {}
+
+    kwargs = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS:
+        if driver == "sync":
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+        else:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return kwargs
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while a write is in progress; NORMAL sync is
+    # safe under WAL and avoids an fsync per commit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs("sync"))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine shares the database with `engine`; it is what lets a single
+# worker keep many requests in flight without tying up the request threadpool.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_kwargs("async"))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 Base = declarative_base()
 
 def get_db():
@@ -26,4 +138,48 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# SQLite has a single writer and makes the others poll for the lock until
+# busy_timeout runs out. Under load the polling is unfair and some RSVPs
+# waited past the timeout ("database is locked"), so write sessions of a
+# process queue on an asyncio lock instead and reach SQLite one at a time.
+# Other processes (more gunicorn workers, `python -m app.worker`) still
+# contend through busy_timeout; run SQLite with one writing process.
+_sqlite_write_locks = weakref.WeakKeyDictionary()
+
+
+def _sqlite_write_lock() -> asyncio.Lock:
+    # One lock per event loop; tests and scripts may run several in turn
+    loop = asyncio.get_running_loop()
+    lock = _sqlite_write_locks.get(loop)
+    if lock is None:
+        lock = _sqlite_write_locks[loop] = asyncio.Lock()
+    return lock
+
+
+@asynccontextmanager
+async def write_session():
+    """
+    An async session for work that writes. On SQLite it holds this process's
+    write lock until it is closed; on Postgres it is a plain session.
+    """
+    if not IS_SQLITE:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    async with _sqlite_write_lock():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+async def get_async_write_db():
+    """Dependency for routes that write; see write_session()."""
+    async with write_session() as db:
+        yield db
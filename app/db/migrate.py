@@ -0,0 +1,117 @@
+"""
+Create the database schema and bring existing databases up to date.
+
+    python -m app.db.migrate
+
+Run it once per deploy before the web workers start (start.sh and the Docker
+image do), so worker boot never waits on the database. Missing tables are
+created with their indexes; tables from older releases are then upgraded by
+the steps in upgrade_schema(). Every step checks before it changes anything,
+so running it again is a no-op.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.db.database import Base, engine
+from app.services import search
+from models import booking, event, job, user  # noqa: F401  (registers the tables)
+
+logger = logging.getLogger(__name__)
+
+
+def create_schema(bind=engine) -> None:
+    """Create missing tables on `bind`, an Engine or a sync Connection, and upgrade the rest."""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            create_schema(conn)
+        return
+    Base.metadata.create_all(bind=bind)
+    upgrade_schema(bind)
+
+
+def _backfill_event_dates(conn) -> None:
+    # events.date was nullable before keyset pagination on (date, id); rows
+    # without a date get the column's default so they sort deterministically
+    filled = conn.execute(text("UPDATE events SET date = CURRENT_TIMESTAMP WHERE date IS NULL")).rowcount
+    if filled:
+        logger.info("Backfilled the date of %d event(s)", filled)
+    # SQLite can't add NOT NULL to an existing column; the ORM always sets it
+    if conn.dialect.name == "postgresql":
+        date = next(c for c in inspect(conn).get_columns("events") if c["name"] == "date")
+        if date["nullable"]:
+            conn.execute(text("ALTER TABLE events ALTER COLUMN date SET NOT NULL"))
+
+
+def _add_missing_columns(conn) -> set:
+    # Columns added to the models since a table was created. Every NOT NULL
+    # one has a server default, which SQLite requires to add it in place and
+    # which fills the existing rows. Returns the "table.column" names added.
+    added = set()
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            logger.info("Added column %s.%s", table.name, column.name)
+            added.add(f"{table.name}.{column.name}")
+    return added
+
+
+def _dedupe_bookings(conn) -> None:
+    # ux_bookings_user_event can't be built while a user has two bookings for
+    # one event; the oldest booking is kept
+    if "ux_bookings_user_event" in {index["name"] for index in inspect(conn).get_indexes("bookings")}:
+        return
+    removed = conn.execute(
+        text("DELETE FROM bookings WHERE id NOT IN (SELECT MIN(id) FROM bookings GROUP BY user_id, event_id)")
+    ).rowcount
+    if removed:
+        logger.info("Removed %d duplicate booking(s)", removed)
+
+
+def _create_missing_indexes(conn) -> None:
+    # create_all skips tables that already exist, indexes included.
+    # Dialect-specific indexes (ix_events_search) are skipped elsewhere.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _count_attendees(conn) -> None:
+    # Bookings that predate the status column are all confirmed, and events
+    # that predate capacity are unlimited, so every booking holds a seat
+    conn.execute(text("UPDATE events SET attendee_count = (SELECT COUNT(*) FROM bookings WHERE bookings.event_id = events.id)"))
+
+
+def _build_search_index(conn) -> None:
+    # events_fts is created by an after_create hook on events, which doesn't
+    # fire for a table that already exists. Events written without it (older
+    # releases, bulk loads) are only searchable after a rebuild, so the index
+    # is rebuilt from the events table every time.
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(text(event.EVENTS_FTS_DDL))
+    conn.execute(search.REBUILD_FTS)
+
+
+def upgrade_schema(conn) -> None:
+    """Apply the changes create_all can't make to tables that already exist."""
+    _backfill_event_dates(conn)
+    added = _add_missing_columns(conn)
+    _dedupe_bookings(conn)
+    _create_missing_indexes(conn)
+    if "events.attendee_count" in added:
+        _count_attendees(conn)
+    _build_search_index(conn)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    create_schema()
+    logger.info("Schema is up to date on %s", engine.url.render_as_string(hide_password=True))
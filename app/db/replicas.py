@@ -0,0 +1,173 @@
+# Read replicas for GET endpoints.
+#
+# DATABASE_REPLICA_URLS is a comma-separated list of database URLs (same form
+# as DATABASE_URL). Read-only routes take their session from read_session(),
+# which picks a healthy replica round-robin and falls back to the primary
+# when none is available or when the data was written very recently.
+#
+# Read-your-writes: write routes call mark_write() with the keys they changed
+# (the same names as the response cache namespaces, plus "user:<id>"), and
+# reads touching those keys use the primary for REPLICA_STICKY_SECONDS.
+# Routes mark right after they commit and before they invalidate the response
+# cache, so a refill right after an invalidation is never rendered from a
+# replica that hasn't caught up.
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.kvstore import create_store
+from app.core.metrics import instrument_engine
+from app.core.response_cache import RESPONSE_CACHE_URL
+from app.core.security import get_current_user
+from app.db.database import AsyncSessionLocal, _engine_kwargs, _set_sqlite_pragmas, to_async_url
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Longer than the replication lag you expect
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+# How long a failing replica is skipped before it's tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+# Where recent-write markers live; use redis:// with several workers so a
+# write on one worker makes reads on every worker stick to the primary
+REPLICA_STICKY_STORE_URL = os.getenv("REPLICA_STICKY_STORE_URL", RESPONSE_CACHE_URL)
+
+
+class Replica:
+    def __init__(self, url: str):
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        self.url = url
+        self.engine = create_async_engine(to_async_url(url), **_engine_kwargs("async"))
+        if url.startswith("sqlite"):
+            event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
+        instrument_engine(self.engine.sync_engine, "replica")
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def mark_down(self) -> None:
+        if self.healthy:
+            logger.warning("Replica %s is unavailable; reading from other replicas or the primary", self.engine.url.host or self.url)
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+class ReplicaSet:
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._next = 0
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    async def check(self) -> None:
+        """Ping every replica, marking failures down and recoveries up."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception:
+                replica.mark_down()
+            else:
+                replica.down_until = 0.0
+
+    async def check_periodically(self, interval: float = REPLICA_HEALTH_INTERVAL) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_set = ReplicaSet(DATABASE_REPLICA_URLS) if DATABASE_REPLICA_URLS else None
+_recent_writes = create_store(REPLICA_STICKY_STORE_URL, maxsize=100000)
+
+
+async def mark_write(*keys: str) -> None:
+    """Send reads of `keys` to the primary for the next REPLICA_STICKY_SECONDS."""
+    if replica_set is None:
+        return
+    for key in keys:
+        await _recent_writes.set(f"ryw:{key}", b"1", ttl=REPLICA_STICKY_SECONDS)
+
+
+async def _recently_written(keys) -> bool:
+    for key in keys:
+        if await _recent_writes.get(f"ryw:{key}") is not None:
+            return True
+    return False
+
+
+async def _replica_session(keys):
+    """A session on a healthy replica that has already connected, or None."""
+    if replica_set is None or await _recently_written(keys):
+        return None, None
+    while True:
+        replica = replica_set.pick()
+        if replica is None:
+            return None, None
+        db = replica.sessionmaker()
+        try:
+            # Connect up front so an unreachable replica fails over now
+            # rather than failing this request
+            await db.connection()
+        except (OperationalError, InterfaceError, OSError):
+            await db.close()
+            replica.mark_down()
+            continue
+        return replica, db
+
+
+async def _session(keys):
+    replica, db = await _replica_session(keys)
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    try:
+        yield db
+    except (OperationalError, InterfaceError):
+        # Lost the replica mid-request; the health check brings it back
+        replica.mark_down()
+        raise
+    finally:
+        await db.close()
+
+
+def read_session(*keys: str, per_user: bool = False):
+    """
+    Dependency yielding a session for a read-only route. `keys` are
+    recent-write keys and may use the route's path parameters, e.g.
+    "event:{event_id}"; `per_user` adds "user:<current user id>".
+    """
+    if per_user:
+        async def dependency(request: Request, current_user=Depends(get_current_user)):
+            names = [key.format(**request.path_params) for key in keys] + [f"user:{current_user.id}"]
+            async for db in _session(names):
+                yield db
+    else:
+        async def dependency(request: Request):
+            names = [key.format(**request.path_params) for key in keys]
+            async for db in _session(names):
+                yield db
+    return dependency
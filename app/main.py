@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.api.api import api_router
-from app.db.database import Base, engine
+from app.core import passwords
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.pubsub import broker
+from app.db.database import IS_SQLITE, async_engine
+from app.db.migrate import create_schema
+from app.db.replicas import replica_set
+from app.services import jobs, notifications, reservations  # notifications registers job handlers
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 app = FastAPI(
     title="EventEase Backend",
@@ -25,9 +36,71 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compress large JSON payloads (event and attendee lists). Brotli is used when
+# the optional brotli-asgi package is installed; it falls back to gzip for
+# clients that don't accept br. Both leave responses that already have a
+# Content-Encoding alone, which is how the SSE stream and the attendee export
+# opt out: compressing them would buffer each message until the compressor
+# flushes.
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1024, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Outermost, so the recorded latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Include API routes
 app.include_router(api_router)
 
+
+_background_tasks = []
+
+# Run the job worker inside each web worker. Set to 0 when running
+# `python -m app.worker` as a separate process instead.
+JOB_WORKER_IN_PROCESS = os.getenv("JOB_WORKER_IN_PROCESS", "1").strip().lower() in ("1", "true", "yes", "on")
+
+# Deployments create the schema with `python -m app.db.migrate` before the
+# workers start. For the local SQLite file it is also done on startup so
+# `uvicorn app.main:app` works on a fresh checkout.
+AUTO_CREATE_SCHEMA = os.getenv("AUTO_CREATE_SCHEMA", "1" if IS_SQLITE else "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if AUTO_CREATE_SCHEMA:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(create_schema)
+    await broker.start()
+    if reservations.RECONCILE_INTERVAL > 0:
+        _background_tasks.append(
+            asyncio.create_task(reservations.reconcile_periodically(reservations.RECONCILE_INTERVAL))
+        )
+    if JOB_WORKER_IN_PROCESS:
+        _background_tasks.append(asyncio.create_task(jobs.work()))
+    if replica_set is not None:
+        _background_tasks.append(asyncio.create_task(replica_set.check_periodically()))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await broker.stop()
+    # Close pooled async connections so the worker can exit cleanly
+    await async_engine.dispose()
+    if replica_set is not None:
+        await replica_set.dispose()
+    passwords.shutdown()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 def root():
     return {"message": "EventEase backend is running!"}
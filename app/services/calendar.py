@@ -0,0 +1,196 @@
+# iCalendar (RFC 5545) feeds for GET /events/{id}.ics and /bookings/me.ics.
+#
+# Rendered feeds live in the response cache under their own namespaces
+# (event_feed_cache_namespace / user_feed_cache_namespace) for ICS_CACHE_TTL,
+# much longer than the JSON bodies, since clients poll about hourly. Writers
+# invalidate only the feeds they affect: an RSVP or cancel the user's feed,
+# a promotion the promoted users' feeds, an event update the event's feed.
+# Its attendees' feeds are invalidated by a job (feeds_changed), and only
+# when a field the feed shows changed, so the request never loops over them.
+# Polls of an unchanged feed are answered from the cache, usually with a
+# 304, without touching the database.
+#
+# SEQUENCE and the ETags come from Event.calendar_version, which only moves
+# when those fields change; Event.version also moves with every RSVP.
+
+import datetime
+import os
+import time
+from email.utils import formatdate
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.etag import ETAG_HEADER, LAST_MODIFIED_HEADER, etag_matches, make_etag, not_modified, unmodified_since
+from app.core.response_cache import RESPONSE_CACHE_URL, response_cache, user_feed_cache_namespace
+from app.services.jobs import handler
+from models.booking import Booking, BOOKING_WAITLISTED
+from models.event import Event
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+# How often calendar apps are asked to poll; also the HTTP max-age
+ICS_REFRESH_MINUTES = int(os.getenv("ICS_REFRESH_MINUTES", "60"))
+# How long a rendered feed stays cached. Invalidation keeps a shared cache
+# fresh, so a day is safe there. A per-process cache only hears about its own
+# worker's writes, so it keeps feeds for one refresh interval, which is as
+# stale as a polling client expects them to be anyway.
+ICS_CACHE_TTL = float(os.getenv("ICS_CACHE_TTL", 86400 if RESPONSE_CACHE_URL else ICS_REFRESH_MINUTES * 60))
+# Event fields that appear in a feed; changing one bumps Event.calendar_version
+CALENDAR_FIELDS = ("title", "description", "date", "location")
+PRODID = "-//EventEase//EventEase Backend//EN"
+UID_DOMAIN = "eventease"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Split a content line into 75-octet chunks without breaking UTF-8 characters."""
+    if len(line.encode()) <= 75:
+        return line
+    chunks, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode())
+        # Continuation lines start with a space, which counts toward their 75
+        if size + width > (75 if not chunks else 74):
+            chunks.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    chunks.append(current)
+    return "\r\n ".join(chunks)
+
+
+def _utc(value: datetime.datetime) -> str:
+    # Naive datetimes are stored as UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _vevent(row, stamp: str, tentative: bool = False) -> list:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{row.event_id}@{UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_utc(row.date)}",
+        # SEQUENCE tells clients an updated copy replaces the one they have
+        f"SEQUENCE:{row.calendar_version - 1}",
+        f"SUMMARY:{_escape(row.title)}",
+    ]
+    if row.description:
+        lines.append(f"DESCRIPTION:{_escape(row.description)}")
+    if row.location:
+        lines.append(f"LOCATION:{_escape(row.location)}")
+    lines.append(f"STATUS:{'TENTATIVE' if tentative else 'CONFIRMED'}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def render_calendar(name: str, rows, tentative=()) -> bytes:
+    """
+    Render a VCALENDAR with one VEVENT per row (event_id, title, description,
+    date, location, calendar_version). Events whose ids are in `tentative` are
+    marked TENTATIVE, e.g. waitlisted bookings.
+    """
+    stamp = _utc(datetime.datetime.utcnow())
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{ICS_REFRESH_MINUTES}M",
+        f"X-PUBLISHED-TTL:PT{ICS_REFRESH_MINUTES}M",
+    ]
+    for row in rows:
+        lines.extend(_vevent(row, stamp, row.event_id in tentative))
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode()
+
+
+_EVENT_COLUMNS = (
+    Event.id.label("event_id"),
+    Event.title,
+    Event.description,
+    Event.date,
+    Event.location,
+    Event.calendar_version,
+)
+
+
+def calendar_fields(event: Event) -> tuple:
+    return tuple(getattr(event, field) for field in CALENDAR_FIELDS)
+
+
+async def event_feed(db: AsyncSession, event_id: int) -> Optional[Tuple[bytes, str]]:
+    """(body, etag) of the feed for one event, or None if it doesn't exist."""
+    row = (await db.execute(select(*_EVENT_COLUMNS).where(Event.id == event_id))).first()
+    if row is None:
+        return None
+    return render_calendar(row.title, [row]), make_etag("event-ics", event_id, row.calendar_version)
+
+
+async def user_feed(db: AsyncSession, user_id: int) -> Tuple[bytes, str]:
+    """(body, etag) of the feed of every event the user has RSVP'd to."""
+    rows = (
+        await db.execute(
+            select(Booking.id, Booking.status, Booking.version, *_EVENT_COLUMNS)
+            .join(Event, Event.id == Booking.event_id)
+            .where(Booking.user_id == user_id)
+            .order_by(Event.date, Event.id)
+        )
+    ).all()
+    waitlisted = {row.event_id for row in rows if row.status == BOOKING_WAITLISTED}
+    etag = make_etag("user-ics", user_id, [(r.id, r.version, r.event_id, r.calendar_version) for r in rows])
+    return render_calendar("My EventEase RSVPs", rows, waitlisted), etag
+
+
+async def feed_response(
+    namespace: str,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    render: Callable[[], Awaitable[Tuple[bytes, str]]],
+) -> Response:
+    """
+    Serve a feed from the response cache, rendering it with `render()` on a
+    miss. Answers 304 when the client's ETag or Last-Modified still holds.
+    Last-Modified is when the cached copy was rendered.
+    """
+    entry, cache_version = await response_cache.get(namespace)
+    if entry is None:
+        body, etag = await render()
+        headers = {
+            ETAG_HEADER: etag,
+            LAST_MODIFIED_HEADER: formatdate(time.time(), usegmt=True),
+            "Cache-Control": f"private, max-age={ICS_REFRESH_MINUTES * 60}",
+        }
+        await response_cache.set(namespace, "", body, headers, cache_version, ttl=ICS_CACHE_TTL)
+    else:
+        body, headers = entry["body"].encode(), entry["headers"]
+
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if etag_matches(if_none_match, headers[ETAG_HEADER]) or (
+        not if_none_match and unmodified_since(if_modified_since, headers[LAST_MODIFIED_HEADER])
+    ):
+        return not_modified(headers[ETAG_HEADER], headers)
+    return Response(content=body, media_type=ICS_MEDIA_TYPE, headers=headers)
+
+
+@handler("calendar.feeds_changed")
+async def feeds_changed(db: AsyncSession, payload: dict) -> None:
+    """payload: {"event_id": int} for the feeds of its attendees, or {"user_ids": [int, ...]}"""
+    user_ids = payload.get("user_ids")
+    if user_ids is None:
+        user_ids = (await db.scalars(select(Booking.user_id).where(Booking.event_id == payload["event_id"]))).all()
+    await response_cache.invalidate(*(user_feed_cache_namespace(user_id) for user_id in user_ids))
@@ -0,0 +1,85 @@
+# "Events near me" without PostGIS.
+#
+# A bounding box around the search circle is matched against the
+# (latitude, longitude) index, which works the same on Postgres and SQLite.
+# Only ids and coordinates of the rows in the box are loaded; the exact
+# great-circle distance is computed here, which drops the box's corners and
+# gives the order. Pages are keyset-paginated on (distance, id).
+
+import heapq
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.event import Event
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """
+    (min_lat, max_lat, longitude ranges) of the smallest box holding every
+    point within `radius_km`. Boxes crossing the antimeridian are split in
+    two; boxes reaching a pole cover every longitude.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    dlng = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180:
+        return min_lat, max_lat, [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+
+def within_box(lat: float, lng: float, radius_km: float):
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    return and_(
+        Event.latitude.between(min_lat, max_lat),
+        or_(*(Event.longitude.between(low, high) for low, high in lng_ranges)),
+    )
+
+
+async def nearby(
+    db: AsyncSession,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    limit: int,
+    after: Optional[Tuple[float, int]] = None,
+    filters=(),
+) -> Tuple[List[Tuple[float, int]], bool]:
+    """
+    One page of (distance_km, event_id) within `radius_km`, nearest first,
+    after the (distance, id) cursor. Returns the page and whether more follow.
+    `filters` are extra WHERE clauses (e.g. a date range).
+    """
+    candidates = (
+        await db.execute(
+            select(Event.id, Event.latitude, Event.longitude).where(within_box(lat, lng, radius_km), *filters)
+        )
+    ).all()
+    hits = []
+    for event_id, event_lat, event_lng in candidates:
+        distance = haversine_km(lat, lng, event_lat, event_lng)
+        if distance <= radius_km and (after is None or (distance, event_id) > after):
+            hits.append((distance, event_id))
+    page = heapq.nsmallest(limit + 1, hits)
+    return page[:limit], len(page) > limit
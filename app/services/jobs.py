@@ -0,0 +1,190 @@
+# Durable background jobs.
+#
+# Routes call enqueue() inside their own transaction, so a job exists exactly
+# when the change that caused it was committed. Workers (the in-process one
+# started by app/main.py, or `python -m app.worker`) claim due jobs, run the
+# registered handler in a fresh session and retry failures with exponential
+# backoff. Claiming uses FOR UPDATE SKIP LOCKED plus a conditional UPDATE, so
+# any number of workers can poll the same table. Delivery is at-least-once:
+# handlers must tolerate running again after a crash or timeout.
+
+import asyncio
+import datetime
+import logging
+import os
+import random
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal, write_session
+from models.job import Job, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "20"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry n waits about JOB_BACKOFF_BASE * 2**(n-1) seconds, capped at JOB_BACKOFF_MAX
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "5"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+# A running job whose worker died is retried after this many seconds
+JOB_LOCK_TIMEOUT = float(os.getenv("JOB_LOCK_TIMEOUT", "300"))
+
+_handlers = {}
+
+
+def handler(kind: str):
+    """Register `async def fn(db, payload)` as the handler for jobs of `kind`."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(db: AsyncSession, kind: str, payload: dict, delay: float = 0, max_attempts: int = None) -> Job:
+    """Add a job to the caller's transaction. It runs once the caller commits."""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status=JOB_QUEUED,
+        run_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=delay),
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    return job
+
+
+def backoff(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_BASE * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+    # Jitter so jobs that failed together don't retry together
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def claim(db: AsyncSession, limit: int = JOB_BATCH_SIZE) -> list:
+    """Mark up to `limit` due jobs as running and return them."""
+    now = datetime.datetime.utcnow()
+    due = (
+        await db.scalars(
+            select(Job.id)
+            .where(Job.status == JOB_QUEUED, Job.run_at <= now)
+            .order_by(Job.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not due:
+        await db.commit()
+        return []
+    # The status check keeps two workers from claiming the same job on
+    # databases without row locks (SQLite)
+    claimed = (
+        await db.scalars(
+            update(Job)
+            .where(Job.id.in_(due), Job.status == JOB_QUEUED)
+            .values(status=JOB_RUNNING, locked_at=now, attempts=Job.attempts + 1)
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    await db.commit()
+    return claimed
+
+
+async def requeue_stale(db: AsyncSession) -> int:
+    """Put jobs back whose worker stopped before finishing them."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=JOB_LOCK_TIMEOUT)
+    result = await db.execute(
+        update(Job)
+        .where(Job.status == JOB_RUNNING, Job.locked_at < cutoff)
+        .values(status=JOB_QUEUED, locked_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def _finish(job_id: int, error: str = None, retry_in: float = None) -> None:
+    async with write_session() as db:
+        if error is None:
+            await db.execute(delete(Job).where(Job.id == job_id))
+        elif retry_in is None:
+            await db.execute(
+                update(Job).where(Job.id == job_id).values(status=JOB_FAILED, locked_at=None, last_error=error)
+            )
+        else:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(
+                    status=JOB_QUEUED,
+                    locked_at=None,
+                    last_error=error,
+                    run_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=retry_in),
+                )
+            )
+        await db.commit()
+
+
+async def run_job(job: Job) -> bool:
+    """Run one claimed job in its own session. Returns True on success."""
+    fn = _handlers.get(job.kind)
+    try:
+        if fn is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        async with AsyncSessionLocal() as db:
+            await fn(db, job.payload)
+            await db.commit()
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed permanently: %s", job.id, job.kind, error)
+            await _finish(job.id, error)
+        else:
+            logger.warning("Job %s (%s) failed, attempt %s/%s: %s", job.id, job.kind, job.attempts, job.max_attempts, error)
+            await _finish(job.id, error, retry_in=backoff(job.attempts))
+        return False
+    await _finish(job.id)
+    return True
+
+
+async def run_pending(limit: int = JOB_BATCH_SIZE) -> int:
+    """Claim and run one batch of due jobs. Returns how many were claimed."""
+    async with write_session() as db:
+        jobs = await claim(db, limit)
+    for job in jobs:
+        await run_job(job)
+    return len(jobs)
+
+
+async def drain(limit: int = 1000) -> int:
+    """Run due jobs until none are left (or `limit` were run). Handy in tests and scripts."""
+    total = 0
+    while total < limit:
+        ran = await run_pending(min(JOB_BATCH_SIZE, limit - total))
+        if not ran:
+            break
+        total += ran
+    return total
+
+
+async def work(poll_interval: float = JOB_POLL_INTERVAL) -> None:
+    """Worker loop: run due jobs, sleeping `poll_interval` whenever the queue is empty."""
+    last_requeue = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            if loop.time() - last_requeue > JOB_LOCK_TIMEOUT / 2:
+                async with write_session() as db:
+                    if await requeue_stale(db):
+                        logger.warning("Requeued stale jobs")
+                last_requeue = loop.time()
+            if await run_pending():
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Job worker iteration failed")
+        await asyncio.sleep(poll_interval)
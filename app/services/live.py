@@ -0,0 +1,63 @@
+# Live attendance for GET /events/{id}/live.
+#
+# Writers call publish_counts() after committing; every watcher of the event
+# on every worker gets the new counts from the broker, so watching costs no
+# queries beyond the one snapshot taken per write.
+
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pubsub import broker
+from app.core.response_cache import dump_json
+from models.booking import Booking, BOOKING_WAITLISTED
+from models.event import Event
+
+
+def live_channel(event_id: int) -> str:
+    return f"event:{event_id}:live"
+
+
+async def snapshots(db: AsyncSession, event_ids) -> dict:
+    """Current counts for the given events, keyed by id (missing events are absent)."""
+    waitlisted = (
+        select(Booking.event_id, func.count().label("waitlisted"))
+        .where(Booking.event_id.in_(event_ids), Booking.status == BOOKING_WAITLISTED)
+        .group_by(Booking.event_id)
+        .subquery()
+    )
+    rows = (
+        await db.execute(
+            select(Event.id, Event.attendee_count, Event.capacity, func.coalesce(waitlisted.c.waitlisted, 0))
+            .outerjoin(waitlisted, waitlisted.c.event_id == Event.id)
+            .where(Event.id.in_(event_ids))
+        )
+    ).all()
+    return {
+        event_id: {
+            "event_id": event_id,
+            "attendee_count": attendee_count,
+            "capacity": capacity,
+            "seats_left": None if capacity is None else max(capacity - attendee_count, 0),
+            "waitlisted": waitlisted_count,
+        }
+        for event_id, attendee_count, capacity, waitlisted_count in rows
+    }
+
+
+async def snapshot(db: AsyncSession, event_id: int) -> Optional[dict]:
+    return (await snapshots(db, [event_id])).get(event_id)
+
+
+async def publish_counts(db: AsyncSession, *event_ids: int) -> None:
+    """Publish fresh counts for events whose bookings just changed (after commit)."""
+    event_ids = [event_id for event_id in event_ids if broker.wants(live_channel(event_id))]
+    if not event_ids:
+        return
+    for event_id, counts in (await snapshots(db, event_ids)).items():
+        await broker.publish(live_channel(event_id), dump_json(counts))
+
+
+async def publish_deleted(event_id: int) -> None:
+    await broker.publish(live_channel(event_id), dump_json({"event_id": event_id, "deleted": True}))
@@ -0,0 +1,81 @@
+# Job handlers for booking side effects (see app/services/jobs.py).
+#
+# There is no mail provider wired up yet, so send() only logs. Swapping it for
+# an email / push call is the only change needed; retries and backoff come
+# from the job runner.
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.jobs import handler
+from models.booking import BOOKING_CONFIRMED
+from models.event import Event
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+async def send(email: str, subject: str, body: str) -> None:
+    logger.info("Notification to %s: %s - %s", email, subject, body)
+
+
+async def _emails(db: AsyncSession, user_ids) -> dict:
+    rows = (await db.execute(select(User.id, User.email).where(User.id.in_(set(user_ids))))).all()
+    return dict(rows)
+
+
+async def _titles(db: AsyncSession, event_ids) -> dict:
+    rows = (await db.execute(select(Event.id, Event.title).where(Event.id.in_(set(event_ids))))).all()
+    return dict(rows)
+
+
+@handler("booking.created")
+async def booking_created(db: AsyncSession, payload: dict) -> None:
+    """payload: {"user_id": int, "bookings": [{"event_id": int, "status": str}, ...]}"""
+    email = (await _emails(db, [payload["user_id"]])).get(payload["user_id"])
+    if email is None:
+        return
+    titles = await _titles(db, [b["event_id"] for b in payload["bookings"]])
+    for booking in payload["bookings"]:
+        title = titles.get(booking["event_id"], f"event {booking['event_id']}")
+        if booking["status"] == BOOKING_CONFIRMED:
+            await send(email, "RSVP confirmed", f"You're going to {title}.")
+        else:
+            await send(email, "You're on the waitlist", f"{title} is full; we'll let you know if a seat frees up.")
+
+
+@handler("booking.cancelled")
+async def booking_cancelled(db: AsyncSession, payload: dict) -> None:
+    """payload: {"user_id": int, "event_ids": [int, ...]}"""
+    email = (await _emails(db, [payload["user_id"]])).get(payload["user_id"])
+    if email is None:
+        return
+    titles = await _titles(db, payload["event_ids"])
+    for event_id in payload["event_ids"]:
+        await send(email, "RSVP cancelled", f"Your RSVP for {titles.get(event_id, f'event {event_id}')} was cancelled.")
+
+
+@handler("bookings.promoted")
+async def bookings_promoted(db: AsyncSession, payload: dict) -> None:
+    """payload: {"bookings": [{"user_id": int, "event_id": int}, ...]}"""
+    bookings = payload["bookings"]
+    emails = await _emails(db, [b["user_id"] for b in bookings])
+    titles = await _titles(db, [b["event_id"] for b in bookings])
+    for booking in bookings:
+        email = emails.get(booking["user_id"])
+        if email is not None:
+            title = titles.get(booking["event_id"], f"event {booking['event_id']}")
+            await send(email, "You got a seat", f"A seat opened up and your RSVP for {title} is confirmed.")
+
+
+@handler("event.deleted")
+async def event_deleted(db: AsyncSession, payload: dict) -> None:
+    """payload: {"event_id": int, "title": str, "user_ids": [int, ...]}"""
+    for email in (await _emails(db, payload["user_ids"])).values():
+        await send(email, "Event cancelled", f"{payload['title']} has been cancelled by the organizer.")
+
+
+def promoted_payload(bookings) -> dict:
+    return {"bookings": [{"user_id": b.user_id, "event_id": b.event_id} for b in bookings]}
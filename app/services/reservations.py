@@ -0,0 +1,254 @@
+# Seat accounting for events.
+#
+# `Event.attendee_count` is the number of confirmed bookings. It only ever moves
+# through a single conditional UPDATE, so two concurrent RSVPs can't both take
+# the last seat. Every change to an event's seats or waitlist starts by locking
+# the event's row (lock_events), so a cancellation can't promote the waitlist
+# while an RSVP's waitlisted booking is still uncommitted and invisible to it.
+# On SQLite, where FOR UPDATE is a no-op, write sessions take turns instead
+# (app/db/database.py:write_session).
+
+import asyncio
+import logging
+import os
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.response_cache import EVENTS_LIST_CACHE, event_cache_namespace, response_cache, user_feed_cache_namespace
+from app.db.database import write_session
+from app.db.replicas import mark_write
+from app.services import jobs
+from app.services.notifications import promoted_payload
+from models.booking import Booking, BOOKING_CONFIRMED, BOOKING_WAITLISTED
+from models.event import Event
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attendee_count reconciliation runs; 0 disables the job
+RECONCILE_INTERVAL = float(os.getenv("ATTENDEE_RECONCILE_INTERVAL", "3600"))
+
+
+async def lock_events(db: AsyncSession, *event_ids: int) -> None:
+    """
+    Lock the events' rows until the transaction ends, in id order so two
+    transactions locking overlapping events can't deadlock.
+    """
+    await db.execute(select(Event.id).where(Event.id.in_(event_ids)).order_by(Event.id).with_for_update())
+
+
+async def claim_seat(db: AsyncSession, event_id: int) -> bool:
+    """
+    Take one seat if the event has room. Returns False when it's full.
+    """
+    result = await db.execute(
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(Event.capacity.is_(None), Event.attendee_count < Event.capacity),
+        )
+        .values(attendee_count=Event.attendee_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def release_seat(db: AsyncSession, event_id: int) -> None:
+    await db.execute(
+        update(Event)
+        .where(Event.id == event_id, Event.attendee_count > 0)
+        .values(attendee_count=Event.attendee_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def promote_waitlist(db: AsyncSession, event_id: int) -> list:
+    """
+    Confirm waitlisted bookings, oldest first, while the event has free seats.
+    Returns the promoted bookings. The caller commits.
+    """
+    promoted = []
+    while True:
+        candidate = await db.scalar(
+            select(Booking)
+            .where(Booking.event_id == event_id, Booking.status == BOOKING_WAITLISTED)
+            .order_by(Booking.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if candidate is None or not await claim_seat(db, event_id):
+            return promoted
+        candidate.status = BOOKING_CONFIRMED
+        await db.flush()
+        promoted.append(candidate)
+
+
+async def reserve(db: AsyncSession, user_id: int, event_id: int) -> Booking:
+    """
+    Insert a booking for the user, confirmed if a seat was free and waitlisted
+    otherwise. Raises IntegrityError if the user already has a booking for
+    this event. The caller commits.
+    """
+    await lock_events(db, event_id)
+    booking = Booking(user_id=user_id, event_id=event_id, status=BOOKING_WAITLISTED)
+    db.add(booking)
+    # Insert first so a duplicate fails on the unique index before we take a seat
+    await db.flush()
+    if await claim_seat(db, event_id):
+        booking.status = BOOKING_CONFIRMED
+        await db.flush()
+    return booking
+
+
+async def cancel(db: AsyncSession, booking: Booking) -> list:
+    """
+    Delete a booking and hand its seat to the waitlist. Returns the promoted
+    bookings. The caller commits.
+    """
+    event_id = booking.event_id
+    was_confirmed = booking.status == BOOKING_CONFIRMED
+    await lock_events(db, event_id)
+    await db.delete(booking)
+    await db.flush()
+    if not was_confirmed:
+        return []
+    await release_seat(db, event_id)
+    return await promote_waitlist(db, event_id)
+
+
+async def reserve_many(db: AsyncSession, user_id: int, event_ids: list) -> list:
+    """
+    Batch version of reserve(): one INSERT for all bookings and one UPDATE
+    claiming a seat on every event that has room. Raises IntegrityError if
+    the user already has a booking for any of the events. The caller commits.
+    """
+    await lock_events(db, *event_ids)
+    bookings = (
+        await db.scalars(
+            insert(Booking).returning(Booking),
+            [{"user_id": user_id, "event_id": event_id, "status": BOOKING_WAITLISTED} for event_id in event_ids],
+        )
+    ).all()
+    claimed = set(
+        (
+            await db.scalars(
+                update(Event)
+                .where(
+                    Event.id.in_(event_ids),
+                    or_(Event.capacity.is_(None), Event.attendee_count < Event.capacity),
+                )
+                .values(attendee_count=Event.attendee_count + 1)
+                .returning(Event.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+    )
+    confirmed = [booking.id for booking in bookings if booking.event_id in claimed]
+    if confirmed:
+        await db.execute(
+            update(Booking)
+            .where(Booking.id.in_(confirmed))
+            .values(status=BOOKING_CONFIRMED)
+            .execution_options(synchronize_session="fetch")
+        )
+    return bookings
+
+
+async def cancel_many(db: AsyncSession, bookings: list) -> list:
+    """
+    Batch version of cancel() for bookings the caller has locked. Deletes
+    them and releases their seats in bulk, then promotes waitlists only on
+    events that have one. Returns the promoted bookings. The caller commits.
+    """
+    freed = [booking.event_id for booking in bookings if booking.status == BOOKING_CONFIRMED]
+    await lock_events(db, *{booking.event_id for booking in bookings})
+    await db.execute(
+        delete(Booking)
+        .where(Booking.id.in_([booking.id for booking in bookings]))
+        .execution_options(synchronize_session=False)
+    )
+    for booking in bookings:
+        db.expunge(booking)
+    if not freed:
+        return []
+    await db.execute(
+        update(Event)
+        .where(Event.id.in_(freed), Event.attendee_count > 0)
+        .values(attendee_count=Event.attendee_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    waiting = (
+        await db.scalars(
+            select(Booking.event_id)
+            .where(Booking.event_id.in_(freed), Booking.status == BOOKING_WAITLISTED)
+            .distinct()
+        )
+    ).all()
+    promoted = []
+    for event_id in waiting:
+        promoted.extend(await promote_waitlist(db, event_id))
+    return promoted
+
+
+async def reconcile_attendee_counts(db: AsyncSession) -> int:
+    """
+    Repair events whose attendee_count has drifted from their confirmed
+    bookings (e.g. after manual edits). Each event is fixed under its row
+    lock in its own transaction so live RSVPs are never blocked for long.
+    Seats freed by a repair go to the waitlist in the same transaction.
+    Returns the number of events corrected.
+    """
+    confirmed = (
+        select(Booking.event_id, func.count().label("confirmed"))
+        .where(Booking.status == BOOKING_CONFIRMED)
+        .group_by(Booking.event_id)
+        .subquery()
+    )
+    drifted = (
+        await db.scalars(
+            select(Event.id)
+            .outerjoin(confirmed, confirmed.c.event_id == Event.id)
+            .where(Event.attendee_count != func.coalesce(confirmed.c.confirmed, 0))
+        )
+    ).all()
+    await db.commit()
+
+    for event_id in drifted:
+        await lock_events(db, event_id)
+        actual = await db.scalar(
+            select(func.count())
+            .select_from(Booking)
+            .where(Booking.event_id == event_id, Booking.status == BOOKING_CONFIRMED)
+        )
+        await db.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(attendee_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        promoted = await promote_waitlist(db, event_id)
+        if promoted:
+            jobs.enqueue(db, "bookings.promoted", promoted_payload(promoted))
+        await db.commit()
+        await mark_write(EVENTS_LIST_CACHE, event_cache_namespace(event_id))
+        await response_cache.invalidate(
+            EVENTS_LIST_CACHE,
+            event_cache_namespace(event_id),
+            *(user_feed_cache_namespace(b.user_id) for b in promoted),
+        )
+    if drifted:
+        logger.warning("Reconciled attendee_count for %d event(s)", len(drifted))
+    return len(drifted)
+
+
+async def reconcile_periodically(interval: float) -> None:
+    """Run reconcile_attendee_counts every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with write_session() as db:
+                await reconcile_attendee_counts(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("attendee_count reconciliation failed")
@@ -0,0 +1,95 @@
+# Ranked full-text search over events.
+#
+# Postgres uses the GIN-indexed tsvector expression declared in
+# models/event.py and keeps it current by itself. SQLite uses the
+# events_fts FTS5 table, which the event routes update through index_event /
+# unindex_event in the same transaction as the write.
+
+import logging
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.event import Event, SEARCH_VECTOR
+
+logger = logging.getLogger(__name__)
+
+events_fts = table("events_fts", column("rowid"), column("title"), column("description"), column("location"))
+# Re-reads every row of the content table (events) into the FTS index
+REBUILD_FTS = text("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def fts5_query(q: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word is quoted (so FTS5
+    operators in user input are inert) and the last one is a prefix match
+    for type-ahead.
+    """
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return ""
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+async def index_event(db: AsyncSession, event: Event, old: dict = None) -> None:
+    """
+    Add (or re-add) an event to the SQLite FTS table. `old` holds the
+    previously indexed title/description/location when updating.
+    """
+    if _dialect(db) != "sqlite":
+        return
+    if old is not None:
+        await unindex_event(db, event.id, old)
+    await db.execute(
+        text("INSERT INTO events_fts(rowid, title, description, location) VALUES (:id, :title, :description, :location)"),
+        {"id": event.id, "title": event.title, "description": event.description, "location": event.location},
+    )
+
+
+async def unindex_event(db: AsyncSession, event_id: int, indexed: dict) -> None:
+    if _dialect(db) != "sqlite":
+        return
+    await db.execute(
+        text(
+            "INSERT INTO events_fts(events_fts, rowid, title, description, location) "
+            "VALUES ('delete', :id, :title, :description, :location)"
+        ),
+        {"id": event_id, **indexed},
+    )
+
+
+def indexed_fields(event: Event) -> dict:
+    return {"title": event.title, "description": event.description, "location": event.location}
+
+
+async def search_events(db: AsyncSession, q: str, limit: int, offset: int, *columns):
+    """
+    Return up to `limit` rows of `columns` plus a `rank` column (higher is
+    better), best matches first.
+    """
+    if _dialect(db) == "postgresql":
+        tsquery = func.websearch_to_tsquery(text("'english'::regconfig"), q)
+        rank = func.ts_rank_cd(SEARCH_VECTOR, tsquery).label("rank")
+        query = select(*columns, rank).where(SEARCH_VECTOR.op("@@")(tsquery))
+    else:
+        match = fts5_query(q)
+        if not match:
+            return []
+        # bm25() is lower-is-better, so negate it to match ts_rank_cd
+        rank = (-func.bm25(literal_column("events_fts"))).label("rank")
+        query = (
+            select(*columns, rank)
+            .select_from(events_fts.join(Event, Event.id == events_fts.c.rowid))
+            .where(literal_column("events_fts").op("MATCH")(match))
+        )
+    result = await db.execute(query.order_by(rank.desc(), Event.id).limit(limit).offset(offset))
+    return result.all()
@@ -0,0 +1,70 @@
+# Mapping Firebase accounts to rows in `users`.
+#
+# The first login with a Firebase uid creates (or links) the user with one
+# upsert. After that the uid -> user mapping comes from an in-process cache,
+# so repeat logins don't query the database at all.
+
+import os
+from typing import NamedTuple
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.db.database import IS_SQLITE
+from models.user import User
+
+FIREBASE_UID_CACHE_SIZE = int(os.getenv("FIREBASE_UID_CACHE_SIZE", "10000"))
+
+uid_cache = TTLCache(maxsize=FIREBASE_UID_CACHE_SIZE)
+
+_insert = sqlite_insert if IS_SQLITE else pg_insert
+
+
+class ResolvedUser(NamedTuple):
+    id: int
+    name: str
+    email: str
+
+
+async def resolve_firebase_user(db: AsyncSession, uid: str, email: str = None, name: str = "No Name") -> ResolvedUser:
+    """
+    Return the user for a Firebase uid, creating it on first sight.
+
+    A new uid whose email already belongs to an account without a Firebase
+    uid (e.g. one made through /auth/register) is linked to that account
+    instead. Commits its own transaction.
+    """
+    cached = uid_cache.get(uid)
+    if cached is not None:
+        return cached
+
+    email = email or f"{uid}@firebase.local"
+    columns = (User.id, User.name, User.email)
+    # The no-op DO UPDATE makes RETURNING yield the existing row too, so
+    # concurrent first logins for the same uid all get the same user back
+    stmt = _insert(User).values(name=name, email=email, password=None, firebase_uid=uid)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.firebase_uid],
+        set_={"firebase_uid": stmt.excluded.firebase_uid},
+    ).returning(*columns)
+    try:
+        row = (await db.execute(stmt)).one()
+    except IntegrityError:
+        # The email is taken by another account: link it if it has no uid yet,
+        # otherwise resolve to it as before
+        await db.rollback()
+        await db.execute(
+            update(User)
+            .where(User.email == email, User.firebase_uid.is_(None))
+            .values(firebase_uid=uid)
+        )
+        row = (await db.execute(select(*columns).where(User.email == email))).one()
+    await db.commit()
+
+    user = ResolvedUser(*row)
+    uid_cache.set(uid, user)
+    return user
@@ -0,0 +1,28 @@
+"""
+Standalone job worker.
+
+    python -m app.worker
+
+Run it alongside the web service with JOB_WORKER_IN_PROCESS=0 to keep job
+handlers off the web workers' event loops. Several workers can run at once.
+"""
+import asyncio
+import logging
+
+from app.db.database import async_engine
+from app.services import jobs, notifications  # noqa: F401  (registers job handlers)
+
+
+async def main() -> None:
+    try:
+        await jobs.work()
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,117 @@
+"""
+Load-test the API end to end.
+
+    python -m benchmarks                          # seed SQLite, run, compare with baseline.json
+    python -m benchmarks --database-url postgresql://localhost/eventease_bench
+    python -m benchmarks --save-baseline          # record the current numbers as the baseline
+
+Exits with status 1 when a scenario regresses beyond --tolerance or
+answers any request with a server error (see --max-error-rate).
+"""
+import argparse
+import asyncio
+import os
+import platform
+import sys
+
+from benchmarks import runner
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="EventEase API load test")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", "sqlite:///./benchmark.db"))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=10000)
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data already in the database")
+    parser.add_argument("--scenarios", default=",".join(runner.SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds of unrecorded traffic per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="benchmark an already running server instead of starting uvicorn")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed fractional regression")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="allowed fraction of 5xx/failed requests")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="write the results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(runner.SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    # The app reads DATABASE_URL at import time, so set it before seeding
+    # and pass it on to the server process.
+    os.environ["DATABASE_URL"] = args.database_url
+    # The benchmark server authenticates its own tokens, but the app won't
+    # start without a signing key
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    if not args.no_seed:
+        from benchmarks.seed import seed
+
+        sizes = seed(args.users, args.events, args.bookings)
+        print(f"Seeded {sizes['users']} users, {sizes['events']} events, {sizes['bookings']} bookings")
+
+    workload = runner.Workload(args.users, args.events)
+    proc = None
+    base_url = args.url
+    if not base_url:
+        proc = runner.start_server(args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        results = asyncio.run(runner.run_all(base_url, workload, scenarios, args.duration, args.concurrency, args.warmup))
+    finally:
+        if proc:
+            runner.stop_server(proc)
+
+    report = {
+        "meta": {
+            "database": args.database_url.split(":", 1)[0],
+            "users": args.users,
+            "events": args.events,
+            "bookings": args.bookings,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = runner.load_json(args.baseline)["results"]
+    print(runner.format_table(results, baseline))
+
+    if args.output:
+        runner.save_json(args.output, report)
+    failures = runner.check_errors(results, args.max_error_rate)
+    for line in failures:
+        print(f"ERRORS {line}")
+    if args.save_baseline:
+        if failures:
+            print("Not saving a baseline from a run with server errors", file=sys.stderr)
+            return 1
+        runner.save_json(args.baseline, report)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if baseline:
+        regressions = runner.compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        failures += regressions
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
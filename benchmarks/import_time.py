@@ -0,0 +1,89 @@
+"""
+Check that the app imports quickly (cold start of a web worker).
+
+    python -m benchmarks.import_time                  # fails above IMPORT_TIME_BUDGET seconds
+    python -m benchmarks.import_time --budget 0.8 --runs 5
+
+Each run imports the module in a fresh interpreter, with DATABASE_URL
+pointing at an address nothing listens on. Importing the app must not need
+the database or Firebase, so a run that tries to connect fails.
+
+The budget is for the time the app adds on top of a bare `import fastapi`
+measured the same way, so interpreter start-up and machine speed mostly
+cancel out. Exits with status 1 when the median overhead is over budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Seconds on top of BASELINE_MODULE. app.main adds 0.45-0.65 s on a
+# developer laptop; the budget leaves room for slower CI machines.
+DEFAULT_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "1.0"))
+BASELINE_MODULE = "fastapi"
+
+# Prints the import time; the import must not touch the database or Firebase
+PROBE = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+UNREACHABLE_DATABASE_URL = "postgresql://import-check@127.0.0.1:9/none"
+
+
+def measure(module: str) -> float:
+    env = {
+        "JWT_SECRET": "import-check",  # only used if the caller hasn't set a key
+        **os.environ,
+        "DATABASE_URL": UNREACHABLE_DATABASE_URL,
+        "DATABASE_REPLICA_URLS": "",
+    }
+    env.pop("ASYNC_DATABASE_URL", None)
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def overhead(module: str, baseline: str = BASELINE_MODULE, runs: int = 3) -> tuple:
+    """
+    Median import times of `module` and `baseline` over `runs` interleaved
+    runs, so a machine that slows down mid-check slows both alike.
+    """
+    times, baseline_times = [], []
+    for _ in range(runs):
+        baseline_times.append(measure(baseline))
+        times.append(measure(module))
+    return statistics.median(times), statistics.median(baseline_times)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time", description="Import-time budget check")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--baseline", default=BASELINE_MODULE, help="module whose import time is subtracted")
+    parser.add_argument(
+        "--budget", type=float, default=DEFAULT_BUDGET, help="seconds allowed on top of the baseline import"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    try:
+        median, baseline = overhead(args.module, args.baseline, args.runs)
+    except RuntimeError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    extra = median - baseline
+    print(
+        f"import {args.module}: median {median:.3f}s, {extra:.3f}s over import {args.baseline} "
+        f"(budget {args.budget:.3f}s)"
+    )
+    if extra > args.budget:
+        print(f"REGRESSION import {args.module} took {extra:.3f}s over {args.baseline}, budget {args.budget:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+
+# Scenarios run in this order: "cancel" reuses the seats booked by "rsvp".
+SCENARIOS = ("list_events", "rsvp", "cancel", "attendees")
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class Workload:
+    """Builds the requests for each scenario from the seeded dataset sizes."""
+
+    def __init__(self, users: int, events: int, seed_value: int = 42):
+        self.users = users
+        self.events = events
+        self.rng = random.Random(seed_value)
+        self.booked = []
+
+    def _auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer user-{user_id}"}
+
+    def _user(self) -> int:
+        return self.rng.randrange(1, self.users + 1)
+
+    def _event(self) -> int:
+        return self.rng.randrange(1, self.events + 1)
+
+    def request(self, scenario: str):
+        """Return (method, url, kwargs) for one request of `scenario`."""
+        if scenario == "list_events":
+            return "GET", "/events/all", {"params": {"limit": 50}}
+        if scenario == "attendees":
+            return "GET", f"/bookings/event/{self._event()}", {"params": {"limit": 50}}
+        if scenario == "rsvp":
+            user_id, event_id = self._user(), self._event()
+            return "POST", "/bookings/rsvp", {"json": {"event_id": event_id}, "headers": self._auth(user_id), "pair": (user_id, event_id)}
+        if scenario == "cancel":
+            user_id, event_id = self.booked.pop() if self.booked else (self._user(), self._event())
+            return "DELETE", "/bookings/cancel", {"json": {"event_id": event_id}, "headers": self._auth(user_id)}
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(client: httpx.AsyncClient, workload: Workload, scenario: str, duration: float, concurrency: int) -> dict:
+    """
+    Keep `concurrency` clients issuing requests for `duration` seconds.
+    Any response below 500 counts as served (a duplicate RSVP's 400 is a
+    valid answer); 5xx responses and transport errors count as errors.
+    """
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, url, kwargs = workload.request(scenario)
+            pair = kwargs.pop("pair", None)
+            started = time.perf_counter()
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if resp.status_code >= 500:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if pair and resp.status_code == 201:
+                workload.booked.append(pair)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(base_url: str, workload: Workload, scenarios, duration: float, concurrency: int, warmup: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        results = {}
+        for scenario in scenarios:
+            if warmup:
+                await run_scenario(client, workload, scenario, warmup, concurrency)
+            results[scenario] = await run_scenario(client, workload, scenario, duration, concurrency)
+        return results
+
+
+def start_server(port: int, workers: int, env: Optional[dict] = None, timeout: float = 30) -> subprocess.Popen:
+    """Start uvicorn serving benchmarks.server:app and wait until it answers."""
+    cmd = [
+        sys.executable, "-m", "uvicorn", "benchmarks.server:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    proc = subprocess.Popen(cmd, env={**os.environ, **(env or {})})
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def check_errors(results: dict, max_error_rate: float = 0.0) -> list:
+    """
+    Return a list of failures for scenarios whose error rate (5xx and
+    transport errors) is above `max_error_rate`. This doesn't depend on the
+    baseline: a run that returns server errors is never acceptable.
+    """
+    return [
+        f"{scenario}: {r['errors']} errors ({r['error_rate']:.2%} of requests)"
+        for scenario, r in results.items()
+        if r["error_rate"] > max_error_rate
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return a list of regressions: throughput below baseline * (1 - tolerance)
+    or p95 latency above baseline * (1 + tolerance). Scenarios missing from
+    the baseline are skipped. Errors are checked by check_errors().
+    """
+    regressions = []
+    for scenario, current in results.items():
+        base = baseline.get(scenario)
+        if not base:
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: {current['rps']} req/s vs baseline {base['rps']}")
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {current['p95_ms']} ms vs baseline {base['p95_ms']}")
+    return regressions
+
+
+def format_table(results: dict, baseline: Optional[dict] = None) -> str:
+    header = f"{'scenario':<12} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'base req/s':>11} {'base p95':>9}"
+    lines = [header, "-" * len(header)]
+    for scenario, r in results.items():
+        line = f"{scenario:<12} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}"
+        if baseline and scenario in baseline:
+            line += f" {baseline[scenario]['rps']:>11} {baseline[scenario]['p95_ms']:>9}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path: str, data: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,71 @@
+import datetime
+import random
+
+from sqlalchemy import insert, text
+
+from app.db.database import Base, engine, IS_SQLITE
+from models.booking import Booking, BOOKING_CONFIRMED
+from models.event import Event
+from models.user import User
+
+CHUNK = 5000
+
+
+def _chunks(rows):
+    for i in range(0, len(rows), CHUNK):
+        yield rows[i:i + CHUNK]
+
+
+def seed(users: int, events: int, bookings: int, reset: bool = True, seed_value: int = 42) -> dict:
+    """
+    Fill the configured database (DATABASE_URL) with a reproducible dataset.
+    Events have unlimited capacity so seeded bookings are all confirmed.
+    Returns the sizes actually written.
+    """
+    rng = random.Random(seed_value)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            if IS_SQLITE:
+                conn.execute(text("DROP TABLE IF EXISTS events_fts"))
+    Base.metadata.create_all(bind=engine)
+
+    start = datetime.datetime(2026, 1, 1)
+    user_rows = [
+        {"id": i, "name": f"User {i}", "email": f"user{i}@bench.local", "firebase_uid": f"user-{i}"}
+        for i in range(1, users + 1)
+    ]
+    event_rows = [
+        {
+            "id": i,
+            "title": f"Event {i} {rng.choice(['Python', 'Jazz', 'Startup', 'Yoga', 'Chess'])} meetup",
+            "description": f"Benchmark event number {i}",
+            "date": start + datetime.timedelta(hours=rng.randrange(24 * 365)),
+            "location": rng.choice(["Nairobi", "Lagos", "Berlin", "Austin", "Lima"]),
+            "organizer_id": rng.randrange(1, users + 1),
+            "capacity": None,
+            "attendee_count": 0,
+        }
+        for i in range(1, events + 1)
+    ]
+    bookings = min(bookings, users * events)
+    pairs = set()
+    while len(pairs) < bookings:
+        pairs.add((rng.randrange(1, users + 1), rng.randrange(1, events + 1)))
+    booking_rows = [
+        {"user_id": user_id, "event_id": event_id, "status": BOOKING_CONFIRMED}
+        for user_id, event_id in sorted(pairs)
+    ]
+
+    with engine.begin() as conn:
+        for table, rows in ((User, user_rows), (Event, event_rows), (Booking, booking_rows)):
+            for chunk in _chunks(rows):
+                conn.execute(insert(table), chunk)
+        conn.execute(text(
+            "UPDATE events SET attendee_count = "
+            "(SELECT count(*) FROM bookings WHERE bookings.event_id = events.id AND bookings.status = 'confirmed')"
+        ))
+        if IS_SQLITE:
+            conn.execute(text("INSERT INTO events_fts(events_fts) VALUES ('rebuild')"))
+
+    return {"users": users, "events": events, "bookings": len(booking_rows)}
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark: serializing a list response the old way vs the fast path.
+
+    python -m benchmarks.serialization              # 10k attendee rows
+    python -m benchmarks.serialization --rows 50000 --repeat 5
+
+Loads `--rows` bookings for one event into an in-memory SQLite database, runs
+the attendee list query (GET /bookings/event/{id}) once, then times turning
+the rows into response bytes:
+
+  response_model   dicts -> response_model validation -> jsonable_encoder -> json
+                   (what FastAPI does when a route returns a list of dicts)
+  dump_json        dicts -> dump_json with orjson, as the route does with
+                   FAST_JSON_RESPONSES on (orjson must be installed)
+  dump_json stdlib the same dicts through the stdlib encoder, for reference
+
+Every path must produce the same JSON; the run fails if they differ.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import sys
+import time
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.core import response_cache
+from app.db.database import Base
+from models.booking import Booking, BOOKING_CONFIRMED
+from models.event import Event
+from models.user import User
+from schemas.booking import BookingWithUser
+
+
+def load_rows(count: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    created = datetime.datetime(2030, 1, 1, 12, 0, 0, 123456)
+    with Session(engine) as db:
+        db.execute(insert(User), [{"id": i, "name": f"User {i}", "email": f"user{i}@bench.local"} for i in range(1, count + 1)])
+        db.add(Event(id=1, title="Benchmark", date=created, organizer_id=1, capacity=None))
+        db.execute(
+            insert(Booking),
+            [{"user_id": i, "event_id": 1, "status": BOOKING_CONFIRMED, "created_at": created} for i in range(1, count + 1)],
+        )
+        db.commit()
+        started = time.perf_counter()
+        rows = db.execute(
+            select(
+                Booking.id,
+                Booking.user_id,
+                Booking.event_id,
+                Booking.status,
+                Booking.created_at,
+                User.name.label("user_name"),
+                User.email.label("user_email"),
+            )
+            .join(User, User.id == Booking.user_id)
+            .where(Booking.event_id == 1)
+            .order_by(Booking.id)
+        ).all()
+        query_seconds = time.perf_counter() - started
+    engine.dispose()
+    return rows, query_seconds
+
+
+def to_dicts(rows) -> list:
+    # Same shape as app.api.routes.booking.get_event_attendees
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "event_id": row.event_id,
+            "status": row.status,
+            "created_at": row.created_at,
+            "user": {"id": row.user_id, "name": row.user_name, "email": row.user_email},
+        }
+        for row in rows
+    ]
+
+
+FIELD = create_model_field("Response_get_event_attendees", List[BookingWithUser])
+
+
+def via_response_model(rows) -> bytes:
+    content = asyncio.run(serialize_response(field=FIELD, response_content=to_dicts(rows), is_coroutine=True))
+    # JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _dump_json(rows, fast: bool) -> bytes:
+    enabled, response_cache.FAST_JSON_RESPONSES = response_cache.FAST_JSON_RESPONSES, fast
+    try:
+        return response_cache.dump_json(to_dicts(rows))
+    finally:
+        response_cache.FAST_JSON_RESPONSES = enabled
+
+
+def via_dump_json(rows) -> bytes:
+    return _dump_json(rows, fast=True)
+
+
+def via_stdlib(rows) -> bytes:
+    return _dump_json(rows, fast=False)
+
+
+PATHS = {"response_model": via_response_model, "dump_json": via_dump_json, "dump_json stdlib": via_stdlib}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description="List serialization micro-benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rows, query_seconds = load_rows(args.rows)
+    print(f"{len(rows)} rows, query {query_seconds * 1000:.1f} ms, orjson {'on' if response_cache.orjson else 'not installed'}")
+
+    expected = None
+    results = {}
+    for name, fn in PATHS.items():
+        body = fn(rows)
+        parsed = json.loads(body)
+        if expected is None:
+            expected = parsed
+        elif parsed != expected:
+            print(f"{name} produced different JSON than response_model", file=sys.stderr)
+            return 1
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            fn(rows)
+            timings.append(time.perf_counter() - started)
+        results[name] = statistics.median(timings)
+
+    reference = results["response_model"]
+    print(f"{'path':<18} {'median ms':>10} {'speedup':>8}")
+    for name, seconds in results.items():
+        print(f"{name:<18} {seconds * 1000:>10.1f} {reference / seconds:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# ASGI entry point for benchmark runs: the real application with Firebase
+# verification replaced by a stub, so load tests don't need Google
+# credentials or network access.
+#
+#     uvicorn benchmarks.server:app
+#
+# Clients authenticate with "Authorization: Bearer user-<id>".
+from types import SimpleNamespace
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core.security import auth_scheme, get_current_user
+from app.main import app
+
+TOKEN_PREFIX = "user-"
+
+
+def bench_user(token: HTTPAuthorizationCredentials = Depends(auth_scheme)):
+    credentials = token.credentials
+    if not credentials.startswith(TOKEN_PREFIX):
+        raise HTTPException(status_code=401, detail="Invalid benchmark token")
+    user_id = int(credentials[len(TOKEN_PREFIX):])
+    return SimpleNamespace(id=user_id, uid=credentials, email=f"user{user_id}@bench.local", name=f"User {user_id}")
+
+
+app.dependency_overrides[get_current_user] = bench_user
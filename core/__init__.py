@@ -1 +0,0 @@
-# Core package
@@ -0,0 +1,48 @@
+# Gunicorn settings for the production image (see Dockerfile / start.sh).
+# Every value can be overridden from the environment.
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Uvicorn workers are event loops, so one per core is enough to use the machine.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Workers inherit the environment from this (master) process; app/db/database.py
+# reads WEB_CONCURRENCY to split DB_MAX_CONNECTIONS between them.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# X-Forwarded-For is only believed from these addresses (comma-separated IPs
+# or CIDR ranges); from anyone else it is ignored and the peer address is the
+# client IP. Per-IP rate limits key on that IP, so trusting every peer would
+# let any client pick its own key. Behind a proxy (e.g. Render's), set this to
+# the proxy's addresses, or per-IP limits will see every client as the proxy.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# Prometheus metrics from all workers are aggregated through files in this
+# directory (see app/core/metrics.py). It must be set before the workers import
+# the app and is emptied on every start so dead workers' samples don't linger.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "eventease-metrics")
+)
+
+
+def on_starting(server):
+    shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,17 +1,34 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func, literal_column
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import datetime
 
+# Booking.status values. Confirmed bookings hold one of the event's seats;
+# waitlisted ones are promoted in id (FIFO) order as seats free up.
+BOOKING_CONFIRMED = "confirmed"
+BOOKING_WAITLISTED = "waitlisted"
 
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Attendee and "my RSVPs" listings page through bookings by id
+        Index("ix_bookings_event_id_id", "event_id", "id"),
+        Index("ix_bookings_user_id_id", "user_id", "id"),
+        # One booking per user per event, enforced by the database so
+        # concurrent RSVPs can't create duplicates
+        Index("ux_bookings_user_event", "user_id", "event_id", unique=True),
+        # Oldest waitlisted booking for an event
+        Index("ix_bookings_event_status_id", "event_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    status = Column(String, nullable=False, default=BOOKING_CONFIRMED, server_default=BOOKING_CONFIRMED)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every UPDATE (e.g. waitlist promotion); feeds ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
     
     # Relationships
     user = relationship("User", back_populates="bookings")
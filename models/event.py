@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index, DDL, event, func, literal_column, text
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 import datetime
@@ -6,14 +6,57 @@ import datetime
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Keyset pagination for GET /events/all walks (date, id) in order,
+        # optionally scoped to a single organizer.
+        Index("ix_events_date_id", "date", "id"),
+        Index("ix_events_organizer_date_id", "organizer_id", "date", "id"),
+        # Bounding-box prefilter for GET /events/nearby (see app/services/geo.py)
+        Index("ix_events_lat_lng", "latitude", "longitude"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    date = Column(DateTime, default=datetime.datetime.utcnow)
+    date = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     location = Column(String, nullable=True)
+    # WGS84 degrees; both set or both None
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # None means unlimited seats
+    capacity = Column(Integer, nullable=True)
+    # Confirmed bookings; only changed through app/services/reservations.py
+    attendee_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every UPDATE (ORM or Core) that doesn't set it explicitly; feeds ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+    # Bumped by update_event only when a field shown in calendar feeds changes
+    # (see app/services/calendar.py); RSVPs move `version` but not this
+    calendar_version = Column(Integer, nullable=False, default=1, server_default="1")
 
     organizer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
     organizer = relationship("User", back_populates="events")
     bookings = relationship("Booking", back_populates="event")
+
+
+# Full-text search (see app/services/search.py).
+# Postgres: a GIN index over the tsvector expression; queries must use the
+# exact same expression for the planner to pick the index.
+_events = Event.__table__
+SEARCH_VECTOR = func.to_tsvector(
+    text("'english'::regconfig"),
+    func.coalesce(_events.c.title, text("''"))
+    .op("||")(text("' '"))
+    .op("||")(func.coalesce(_events.c.description, text("''")))
+    .op("||")(text("' '"))
+    .op("||")(func.coalesce(_events.c.location, text("''"))),
+)
+Index("ix_events_search", SEARCH_VECTOR, postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite: an external-content FTS5 table over the same columns, kept in sync
+# by the search service when events are created, updated or deleted.
+EVENTS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "title, description, location, content='events', content_rowid='id', tokenize='porter unicode61')"
+)
+event.listen(Event.__table__, "after_create", DDL(EVENTS_FTS_DDL).execute_if(dialect="sqlite"))
@@ -0,0 +1,29 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+from app.db.database import Base
+import datetime
+
+# Job.status values. Jobs that succeed are deleted; ones that exhaust their
+# attempts stay as "failed" for inspection.
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FAILED = "failed"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers look for due jobs in run_at order
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default=JOB_QUEUED, server_default=JOB_QUEUED)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=5, server_default="5")
+    # Naive UTC, compared against datetime.utcnow() by the worker
+    run_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class BookingCreate(BaseModel):
     event_id: int
@@ -8,14 +8,20 @@ class BookingCreate(BaseModel):
 class BookingCancel(BaseModel):
     event_id: int
 
+class BookingBatch(BaseModel):
+    event_ids: List[int]
+
 class BookingResponse(BaseModel):
     id: int
     user_id: int
     event_id: int
+    status: str
     created_at: datetime
 
     class Config:
         from_attributes = True
+        # pydantic 1.x (pinned in requirements.txt) spells it orm_mode
+        orm_mode = True
 
 class UserBase(BaseModel):
     id: int
@@ -40,6 +46,7 @@ class BookingWithUser(BaseModel):
     id: int
     user_id: int
     event_id: int
+    status: str
     created_at: datetime
     user: UserBase
 
@@ -50,6 +57,7 @@ class BookingWithEvent(BaseModel):
     id: int
     user_id: int
     event_id: int
+    status: str
     created_at: datetime
     event: EventBase
 
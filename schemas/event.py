@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, root_validator
 from datetime import datetime
 from typing import Optional
 
@@ -7,19 +7,46 @@ class EventBase(BaseModel):
     title: str
     description: Optional[str] = None
     date: datetime
+    # Omit for unlimited seats
+    capacity: Optional[int] = Field(None, ge=0)
+    # Where the event takes place, for GET /events/nearby
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+
+def coordinates_error(latitude, longitude) -> Optional[str]:
+    if (latitude is None) != (longitude is None):
+        return "latitude and longitude must be given together"
+    return None
 
 
 class EventCreate(EventBase):
-    pass
+    @root_validator(skip_on_failure=True)
+    def coordinates_together(cls, values):
+        error = coordinates_error(values.get("latitude"), values.get("longitude"))
+        if error:
+            raise ValueError(error)
+        return values
 
 
 class EventUpdate(EventBase):
+    # Fields left out keep their stored value, so update_event checks the
+    # coordinates once they are merged with the event's
     pass
 
 
 class EventOut(EventBase):
     id: int
     organizer_id: int
+    attendee_count: int = 0
 
     class Config:
         orm_mode = True
+
+
+class EventStats(BaseModel):
+    id: int
+    attendee_count: int
+    capacity: Optional[int] = None
+    # None when the event has unlimited seats
+    seats_left: Optional[int] = None
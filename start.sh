@@ -14,6 +14,9 @@ else
   echo "No Firebase service account provided via env. Continuing without it."
 fi
 
-# Start Gunicorn with Uvicorn worker (respect $PORT if set)
-PORT=${PORT:-8000}
-exec gunicorn -k uvicorn.workers.UvicornWorker app.main:app -b 0.0.0.0:${PORT} --workers 1
+# Create missing tables once, before any worker starts
+python -m app.db.migrate
+
+# Start Gunicorn with Uvicorn workers. Bind address ($PORT) and worker count
+# ($WEB_CONCURRENCY, defaults to the CPU count) come from gunicorn.conf.py.
+exec gunicorn -c gunicorn.conf.py app.main:app
@@ -0,0 +1,96 @@
+# Point the app at a throwaway SQLite file and turn off the background work
+# it starts on its own. This runs before any test module imports the app, and
+# the settings are read at import time. Set TEST_DATABASE_URL to run against
+# an empty Postgres database instead; every table in it is dropped.
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="eventease-tests-")
+os.environ.update(
+    DATABASE_URL=os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_tmp}/test.db",
+    FIREBASE_SERVICE_ACCOUNT_PATH=os.path.join(_tmp, "missing-service-account.json"),
+    JOB_WORKER_IN_PROCESS="0",
+    ATTENDEE_RECONCILE_INTERVAL="0",
+    RATE_LIMIT_ENABLED="0",
+    BCRYPT_ROUNDS="4",
+    JWT_SECRET="test-secret",
+    # Short, so writers that poll for SQLite's lock fail the stress tests
+    # instead of eventually getting through
+    SQLITE_BUSY_TIMEOUT_MS="100",
+)
+for name in (
+    "JWT_KEYS",
+    "JWT_ACTIVE_KID",
+    "ASYNC_DATABASE_URL",
+    "DATABASE_REPLICA_URLS",
+    "RESPONSE_CACHE_URL",
+    "PUBSUB_URL",
+    "PROMETHEUS_MULTIPROC_DIR",
+):
+    os.environ.pop(name, None)
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Empty tables, a fresh response cache, and the sync engine to seed them with."""
+    from app.core import response_cache as response_cache_module
+    from app.core.kvstore import MemoryStore
+    from app.db.database import Base, engine
+    from app.db.migrate import create_schema
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS events_fts"))
+        Base.metadata.drop_all(bind=conn)
+    create_schema(engine)
+    monkeypatch.setattr(response_cache_module.response_cache, "store", MemoryStore(maxsize=1024))
+    return engine
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a new event loop, closing the async pool inside it."""
+    from app.db.database import async_engine
+
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(database):
+    """Insert a user and return it with the Authorization header of its access token."""
+    from app.core.security import create_token_pair
+    from app.db.database import SessionLocal
+    from models.user import User
+
+    def make(name="User"):
+        with SessionLocal() as db:
+            user = User(name=name, email=f"{name.lower().replace(' ', '.')}.{os.urandom(4).hex()}@example.com")
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            db.expunge(user)
+        token = create_token_pair(user)["access_token"]
+        return SimpleNamespace(user=user, headers={"Authorization": f"Bearer {token}"})
+    return make
@@ -0,0 +1,27 @@
+from benchmarks import runner
+
+
+def result(rps=100.0, p95_ms=50.0, errors=0, requests=1000):
+    return {"requests": requests, "errors": errors, "error_rate": round(errors / requests, 4), "rps": rps, "p95_ms": p95_ms}
+
+
+def test_any_server_error_fails_the_run():
+    results = {"list_events": result(), "rsvp": result(errors=1)}
+    assert runner.check_errors(results) == ["rsvp: 1 errors (0.10% of requests)"]
+    assert runner.check_errors(results, max_error_rate=0.01) == []
+
+
+def test_errors_fail_even_when_the_baseline_had_them():
+    baseline = {"rsvp": result(errors=130)}
+    results = {"rsvp": result(errors=130)}
+    assert runner.compare(results, baseline, tolerance=0.2) == []
+    assert runner.check_errors(results)
+
+
+def test_compare_flags_throughput_and_latency_regressions():
+    baseline = {"rsvp": result(), "cancel": result()}
+    results = {"rsvp": result(rps=70.0), "cancel": result(p95_ms=70.0), "attendees": result(rps=1.0)}
+    assert runner.compare(results, baseline, tolerance=0.2) == [
+        "rsvp: 70.0 req/s vs baseline 100.0",
+        "cancel: p95 70.0 ms vs baseline 50.0",
+    ]
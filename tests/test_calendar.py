@@ -0,0 +1,87 @@
+import re
+
+import pytest
+
+from app.core import response_cache
+from app.services import calendar, jobs
+
+
+@pytest.fixture
+def organizer(make_user):
+    return make_user("Organizer")
+
+
+@pytest.fixture
+def event_id(client, organizer):
+    resp = client.post(
+        "/events/create", json={"title": "Meetup", "date": "2030-01-01T18:00:00", "capacity": 10}, headers=organizer.headers
+    )
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+@pytest.fixture
+def subscriber(client, make_user, event_id):
+    """A user who has RSVP'd to the event, and the path of their feed."""
+    user = make_user("Subscriber")
+    assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=user.headers).status_code == 201
+    url = client.get("/bookings/me/feed", headers=user.headers).json()["url"]
+    return user, url.split("://", 1)[1].split("/", 1)[1]
+
+
+def feed(client, path):
+    resp = client.get("/" + path)
+    assert resp.status_code == 200, resp.text
+    return resp.headers["ETag"], re.findall(r"SEQUENCE:(\d+)", resp.text), resp.text
+
+
+def test_other_users_rsvps_leave_the_feed_alone(client, make_user, event_id, subscriber, monkeypatch):
+    # Rendered fresh on every poll, so only the ETag and SEQUENCE can say it changed
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", False)
+    _, path = subscriber
+    before = feed(client, path)
+    for name in ("Guest 1", "Guest 2"):
+        assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=make_user(name).headers).status_code == 201
+    assert feed(client, path)[:2] == before[:2]
+    assert before[1] == ["0"]
+
+
+def test_event_update_refreshes_attendee_feeds_through_a_job(client, run, organizer, event_id, subscriber):
+    _, path = subscriber
+    run(jobs.drain())  # the RSVP's confirmation
+    etag, sequence, _ = feed(client, path)
+
+    # Capacity isn't in the feed: no job, same feed
+    resp = client.put(
+        f"/events/update/{event_id}",
+        json={"title": "Meetup", "date": "2030-01-01T18:00:00", "capacity": 20},
+        headers=organizer.headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert run(jobs.drain()) == 0
+    assert feed(client, path)[:2] == (etag, sequence)
+
+    resp = client.put(
+        f"/events/update/{event_id}", json={"title": "Meetup (moved)", "date": "2030-01-02T18:00:00"}, headers=organizer.headers
+    )
+    assert resp.status_code == 200, resp.text
+    assert run(jobs.drain()) == 1
+    new_etag, new_sequence, body = feed(client, path)
+    assert new_etag != etag
+    assert new_sequence == ["1"]
+    assert "SUMMARY:Meetup (moved)" in body
+
+
+def test_feeds_are_cached_for_ics_cache_ttl(client, subscriber, monkeypatch):
+    ttls = []
+    store_set = response_cache.response_cache.store.set
+
+    async def recording_set(key, value, ttl=None, nx=False):
+        if ":ics:" in key and not key.startswith("v:"):
+            ttls.append(ttl)
+        return await store_set(key, value, ttl=ttl, nx=nx)
+
+    monkeypatch.setattr(response_cache.response_cache.store, "set", recording_set)
+    feed(client, subscriber[1])
+    assert ttls == [calendar.ICS_CACHE_TTL]
+    assert calendar.ICS_CACHE_TTL > response_cache.RESPONSE_CACHE_TTL
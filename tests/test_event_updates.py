@@ -0,0 +1,58 @@
+import pytest
+
+BERLIN = {"latitude": 52.52, "longitude": 13.405}
+
+
+@pytest.fixture
+def organizer(make_user):
+    return make_user("Organizer")
+
+
+def create_event(client, organizer, **fields):
+    resp = client.post(
+        "/events/create", json={"title": "Meetup", "date": "2030-01-01T18:00:00", **fields}, headers=organizer.headers
+    )
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def update_event(client, organizer, event_id, **fields):
+    return client.put(
+        f"/events/update/{event_id}",
+        json={"title": "Meetup (moved)", "date": "2030-01-02T18:00:00", **fields},
+        headers=organizer.headers,
+    )
+
+
+def nearby_ids(client):
+    resp = client.get("/events/nearby", params={"lat": BERLIN["latitude"], "lng": BERLIN["longitude"]})
+    assert resp.status_code == 200, resp.text
+    return [row["id"] for row in resp.json()]
+
+
+def test_partial_update_keeps_the_coordinates(client, organizer):
+    event_id = create_event(client, organizer, **BERLIN)
+    assert nearby_ids(client) == [event_id]
+
+    resp = update_event(client, organizer, event_id)
+    assert resp.status_code == 200, resp.text
+    assert (resp.json()["latitude"], resp.json()["longitude"]) == (BERLIN["latitude"], BERLIN["longitude"])
+    assert nearby_ids(client) == [event_id]
+
+
+def test_coordinates_are_checked_after_merging(client, organizer):
+    located = create_event(client, organizer, **BERLIN)
+    resp = update_event(client, organizer, located, latitude=52.53)
+    assert resp.status_code == 200, resp.text
+    assert (resp.json()["latitude"], resp.json()["longitude"]) == (52.53, BERLIN["longitude"])
+
+    unlocated = create_event(client, organizer)
+    assert update_event(client, organizer, unlocated, latitude=52.53).status_code == 422
+    assert update_event(client, organizer, located, longitude=None).status_code == 422
+
+
+def test_create_needs_both_coordinates(client, organizer):
+    resp = client.post(
+        "/events/create", json={"title": "Meetup", "date": "2030-01-01T18:00:00", "latitude": 52.52}, headers=organizer.headers
+    )
+    assert resp.status_code == 422
@@ -0,0 +1,162 @@
+import datetime
+import http.server
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi import HTTPException
+
+from app.core import cache as cache_module
+from app.core import firebase
+
+PROJECT_ID = "eventease-test"
+KID = "test-key"
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def cert_server(signing_key):
+    """
+    Local stand-in for Google's cert endpoint, serving the test key's
+    certificate the way securetoken@system.gserviceaccount.com does.
+    """
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(signing_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(signing_key, hashes.SHA256())
+    )
+    body = json.dumps({KID: cert.public_bytes(serialization.Encoding.PEM).decode()}).encode()
+    requests_served = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_served.append(self.path)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=3600")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield SimpleNamespace(url=f"http://127.0.0.1:{server.server_port}/certs", requests=requests_served)
+    server.shutdown()
+
+
+@pytest.fixture
+def verifier(cert_server, monkeypatch):
+    verifier = firebase.FirebaseVerifier(PROJECT_ID, firebase.CertStore(url=cert_server.url))
+    monkeypatch.setattr(firebase, "_verifier", verifier)
+    monkeypatch.setattr(firebase, "_initialized", True)
+    monkeypatch.setattr(firebase, "token_cache", cache_module.TTLCache(maxsize=100))
+    return verifier
+
+
+@pytest.fixture
+def make_token(signing_key):
+    def make(uid="user-1", ttl=600, **overrides):
+        now = int(time.time())
+        claims = {
+            "iss": firebase.ID_TOKEN_ISSUER_PREFIX + PROJECT_ID,
+            "aud": PROJECT_ID,
+            "sub": uid,
+            "iat": now,
+            "exp": now + ttl,
+            "auth_time": now,
+            "email": f"{uid}@example.com",
+            **overrides,
+        }
+        return jwt.encode(claims, signing_key, algorithm="RS256", headers={"kid": KID})
+    return make
+
+
+def count_verifications(verifier, monkeypatch) -> list:
+    calls = []
+    verify = verifier.verify_id_token
+
+    def counting(id_token):
+        calls.append(id_token)
+        return verify(id_token)
+
+    monkeypatch.setattr(verifier, "verify_id_token", counting)
+    return calls
+
+
+def test_verifies_against_local_certs(verifier, make_token, cert_server):
+    served = len(cert_server.requests)
+    claims = firebase.verify_firebase_token(make_token("alice"))
+    assert claims["uid"] == "alice"
+    assert claims["email"] == "alice@example.com"
+    firebase.verify_firebase_token(make_token("bob"))
+    # Both tokens were checked against one download of the certs
+    assert len(cert_server.requests) == served + 1
+    assert verifier.certs.fetches == 1
+
+
+def test_cache_hit_skips_verification(verifier, make_token, monkeypatch):
+    calls = count_verifications(verifier, monkeypatch)
+    token = make_token()
+    first = firebase.verify_firebase_token(token)
+    second = firebase.verify_firebase_token(token)
+    assert second == first
+    assert len(calls) == 1
+
+
+def test_cached_token_is_evicted_at_exp(verifier, make_token, monkeypatch):
+    calls = count_verifications(verifier, monkeypatch)
+    token = make_token(ttl=60)
+    exp = firebase.verify_firebase_token(token)["exp"]
+    firebase.verify_firebase_token(token)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: exp))
+    assert firebase.token_cache.get(firebase._token_key(token)) is None
+    firebase.verify_firebase_token(token)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"exp": int(time.time()) - 10, "iat": int(time.time()) - 700},
+        {"aud": "another-project"},
+        {"iss": "https://securetoken.google.com/another-project"},
+        {"sub": ""},
+    ],
+    ids=["expired", "audience", "issuer", "subject"],
+)
+def test_rejects_invalid_tokens(verifier, make_token, overrides):
+    token = make_token(**overrides)
+    with pytest.raises(HTTPException) as excinfo:
+        firebase.verify_firebase_token(token)
+    assert excinfo.value.status_code == 401
+    assert firebase.token_cache.get(firebase._token_key(token)) is None
+
+
+def test_unconfigured_firebase_is_unavailable(monkeypatch):
+    monkeypatch.setattr(firebase, "_verifier", None)
+    monkeypatch.setattr(firebase, "_initialized", True)
+    with pytest.raises(HTTPException) as excinfo:
+        firebase.verify_firebase_token("anything")
+    assert excinfo.value.status_code == 503
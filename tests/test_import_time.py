@@ -0,0 +1,9 @@
+from benchmarks import import_time
+
+
+def test_app_import_stays_within_budget():
+    # Also fails if importing the app tries to reach the database
+    median, baseline = import_time.overhead("app.main")
+    assert median - baseline < import_time.DEFAULT_BUDGET, (
+        f"import app.main took {median - baseline:.3f}s over import {import_time.BASELINE_MODULE}"
+    )
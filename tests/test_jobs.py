@@ -0,0 +1,153 @@
+import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db.database import AsyncSessionLocal
+from app.services import jobs
+from models.job import Job, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    """Register a handler that fails its first `failures` calls; returns its call log."""
+    calls = []
+
+    def register(failures, kind="test.flaky"):
+        async def handle(db, payload):
+            calls.append(payload)
+            if len(calls) <= failures:
+                raise RuntimeError(f"failure {len(calls)}")
+        monkeypatch.setitem(jobs._handlers, kind, handle)
+        return calls
+    return register
+
+
+async def enqueue(kind="test.flaky", payload=None, **kwargs) -> int:
+    async with AsyncSessionLocal() as db:
+        job = jobs.enqueue(db, kind, payload or {"n": 1}, **kwargs)
+        await db.commit()
+        return job.id
+
+
+async def load(job_id: int):
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+def test_claim_takes_due_jobs_once(database, run):
+    async def scenario():
+        due = [await enqueue(), await enqueue()]
+        later = await enqueue(delay=3600)
+        async with AsyncSessionLocal() as db:
+            claimed = await jobs.claim(db)
+        async with AsyncSessionLocal() as db:
+            again = await jobs.claim(db)
+        return due, later, claimed, again, await load(later)
+
+    due, later, claimed, again, waiting = run(scenario())
+    assert sorted(job.id for job in claimed) == due
+    assert all(job.status == JOB_RUNNING and job.attempts == 1 and job.locked_at for job in claimed)
+    assert again == []
+    assert waiting.status == JOB_QUEUED and waiting.attempts == 0
+
+
+def test_failed_job_is_retried_after_a_backoff(database, run, flaky):
+    calls = flaky(failures=1)
+
+    async def scenario():
+        job_id = await enqueue()
+        before = datetime.datetime.utcnow()
+        ran = await jobs.drain()
+        job = await load(job_id)
+        # Not due again until the backoff has passed
+        ran_early = await jobs.drain()
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == job_id).values(run_at=datetime.datetime.utcnow()))
+            await db.commit()
+        ran_later = await jobs.drain()
+        return before, ran, job, ran_early, ran_later, await load(job_id)
+
+    before, ran, job, ran_early, ran_later, finished = run(scenario())
+    assert ran == 1
+    assert job.status == JOB_QUEUED
+    assert job.attempts == 1
+    assert job.last_error == "RuntimeError: failure 1"
+    delay = (job.run_at - before).total_seconds()
+    assert jobs.JOB_BACKOFF_BASE * 0.8 - 1 <= delay <= jobs.JOB_BACKOFF_BASE * 1.2 + 1
+    assert ran_early == 0
+    assert ran_later == 1
+    assert len(calls) == 2
+    # Succeeded jobs are deleted
+    assert finished is None
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(jobs.random, "uniform", lambda low, high: 1.0)
+    monkeypatch.setattr(jobs, "JOB_BACKOFF_BASE", 5)
+    monkeypatch.setattr(jobs, "JOB_BACKOFF_MAX", 60)
+    assert [jobs.backoff(n) for n in range(1, 6)] == [5, 10, 20, 40, 60]
+
+
+def test_job_fails_for_good_after_max_attempts(database, run, flaky, monkeypatch):
+    calls = flaky(failures=10)
+    monkeypatch.setattr(jobs, "backoff", lambda attempts: 0)
+
+    async def scenario():
+        job_id = await enqueue(max_attempts=3)
+        return await jobs.drain(), await load(job_id)
+
+    ran, job = run(scenario())
+    assert ran == 3
+    assert len(calls) == 3
+    assert job.status == JOB_FAILED
+    assert job.attempts == 3
+    assert job.last_error == "RuntimeError: failure 3"
+    assert job.locked_at is None
+
+
+def test_job_succeeds_once_its_handler_recovers(database, run, flaky, monkeypatch):
+    calls = flaky(failures=2)
+    monkeypatch.setattr(jobs, "backoff", lambda attempts: 0)
+
+    async def scenario():
+        job_id = await enqueue(max_attempts=3)
+        return await jobs.drain(), await load(job_id)
+
+    ran, job = run(scenario())
+    assert ran == 3
+    assert len(calls) == 3
+    assert job is None
+
+
+def test_unknown_kind_fails_like_a_handler_error(database, run, monkeypatch):
+    monkeypatch.setattr(jobs, "backoff", lambda attempts: 0)
+
+    async def scenario():
+        job_id = await enqueue(kind="test.unregistered", max_attempts=1)
+        return await jobs.drain(), await load(job_id)
+
+    ran, job = run(scenario())
+    assert ran == 1
+    assert job.status == JOB_FAILED
+    assert job.last_error.startswith("LookupError")
+
+
+def test_requeue_stale_only_resets_abandoned_jobs(database, run):
+    async def scenario():
+        stale, fresh = await enqueue(), await enqueue()
+        async with AsyncSessionLocal() as db:
+            await jobs.claim(db)
+        async with AsyncSessionLocal() as db:
+            abandoned = datetime.datetime.utcnow() - datetime.timedelta(seconds=jobs.JOB_LOCK_TIMEOUT + 60)
+            await db.execute(update(Job).where(Job.id == stale).values(locked_at=abandoned))
+            await db.commit()
+        async with AsyncSessionLocal() as db:
+            requeued = await jobs.requeue_stale(db)
+        async with AsyncSessionLocal() as db:
+            statuses = dict((await db.execute(select(Job.id, Job.status))).all())
+        return stale, fresh, requeued, statuses
+
+    stale, fresh, requeued, statuses = run(scenario())
+    assert requeued == 1
+    assert statuses == {stale: JOB_QUEUED, fresh: JOB_RUNNING}
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.api.routes import booking as booking_routes
+from app.core import response_cache
+from app.db.database import SessionLocal, async_engine
+from models.booking import Booking
+from models.event import Event
+from models.user import User
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def bookings(make_user):
+    """150 attendees of one event, and 150 events booked by one user."""
+    organizer = make_user("Organizer")
+    attendee = make_user("Attendee")
+    with SessionLocal() as db:
+        event_ids = []
+        for i in range(150):
+            row = Event(title=f"Event {i}", organizer_id=organizer.user.id)
+            db.add(row)
+            db.flush()
+            event_ids.append(row.id)
+            db.add(Booking(user_id=attendee.user.id, event_id=row.id))
+        popular = event_ids[0]
+        for i in range(149):
+            user = User(name=f"Guest {i}", email=f"guest{i}@example.com")
+            db.add(user)
+            db.flush()
+            db.add(Booking(user_id=user.id, event_id=popular))
+        db.commit()
+    return popular, attendee
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/bookings/event/{event_id}", "/bookings/me"],
+    ids=["get_event_attendees", "get_my_rsvps"],
+)
+def test_listing_statement_count_is_independent_of_page_size(client, bookings, path):
+    event_id, attendee = bookings
+    url = path.format(event_id=event_id)
+    counts = {}
+    for limit in (1, 100):
+        with count_statements() as statements:
+            resp = client.get(url, params={"limit": limit}, headers=attendee.headers)
+        assert resp.status_code == 200
+        assert len(resp.json()) == limit
+        counts[limit] = len(statements)
+    assert counts[1] == counts[100], counts
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/bookings/event/{event_id}", "/bookings/me"],
+    ids=["get_event_attendees", "get_my_rsvps"],
+)
+def test_fast_json_responses_match_the_response_model(client, bookings, path, monkeypatch):
+    event_id, attendee = bookings
+    url = path.format(event_id=event_id)
+    responses = {}
+    for fast in (False, True):
+        monkeypatch.setattr(booking_routes, "FAST_JSON_RESPONSES", fast)
+        monkeypatch.setattr(response_cache, "FAST_JSON_RESPONSES", fast)
+        resp = client.get(url, params={"limit": 50}, headers=attendee.headers)
+        assert resp.status_code == 200
+        responses[fast] = resp
+    assert responses[True].json() == responses[False].json()
+    assert responses[True].headers["X-Next-Cursor"] == responses[False].headers["X-Next-Cursor"]
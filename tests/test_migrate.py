@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.migrate import create_schema
+
+# The tables as the first release created them
+OLD_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, email VARCHAR NOT NULL, "
+    "firebase_uid VARCHAR, password VARCHAR)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE TABLE events (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR, date DATETIME, "
+    "location VARCHAR, organizer_id INTEGER NOT NULL REFERENCES users (id))",
+    "CREATE TABLE bookings (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id), "
+    "event_id INTEGER NOT NULL REFERENCES events (id), created_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    "INSERT INTO users (id, name, email) VALUES (1, 'Ada', 'ada@example.com'), (2, 'Bo', 'bo@example.com')",
+    "INSERT INTO events (id, title, date, organizer_id) VALUES (1, 'Meetup', NULL, 1), (2, 'Talk', '2024-05-01', 1)",
+    "INSERT INTO bookings (id, user_id, event_id) VALUES (1, 1, 1), (2, 1, 1), (3, 2, 1), (4, 2, 2)",
+]
+
+
+def upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            conn.execute(text(statement))
+    create_schema(engine)
+    return engine
+
+
+def test_upgrades_tables_from_the_first_release(tmp_path):
+    engine = upgraded(tmp_path)
+    inspector = inspect(engine)
+    event_columns = {column["name"] for column in inspector.get_columns("events")}
+    assert {"capacity", "attendee_count", "version", "calendar_version", "latitude", "longitude"} <= event_columns
+    assert {"status", "version"} <= {column["name"] for column in inspector.get_columns("bookings")}
+    assert "ux_bookings_user_event" in {index["name"] for index in inspector.get_indexes("bookings")}
+    assert "ix_events_date_id" in {index["name"] for index in inspector.get_indexes("events")}
+
+    with engine.connect() as conn:
+        # The duplicate RSVP is gone and the oldest one kept
+        assert conn.execute(text("SELECT id, status FROM bookings ORDER BY id")).all() == [
+            (1, "confirmed"), (3, "confirmed"), (4, "confirmed"),
+        ]
+        assert conn.execute(text("SELECT id, attendee_count, capacity FROM events ORDER BY id")).all() == [
+            (1, 2, None), (2, 1, None),
+        ]
+        assert conn.scalar(text("SELECT COUNT(*) FROM events WHERE date IS NULL")) == 0
+        # Events from before the search index are searchable
+        assert conn.execute(text("SELECT rowid FROM events_fts WHERE events_fts MATCH 'meetup'")).all() == [(1,)]
+
+
+def test_upgrade_is_idempotent(tmp_path):
+    engine = upgraded(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE events SET attendee_count = 5 WHERE id = 2"))
+    create_schema(engine)
+    with engine.connect() as conn:
+        # attendee_count is only computed when the column is added
+        assert conn.scalar(text("SELECT attendee_count FROM events WHERE id = 2")) == 5
+        assert conn.scalar(text("SELECT COUNT(*) FROM bookings")) == 3
+
+
+def test_search_index_is_rebuilt_on_every_run(tmp_path):
+    engine = upgraded(tmp_path)
+    with engine.begin() as conn:
+        # Written without going through the search service
+        conn.execute(text("INSERT INTO events (id, title, date, organizer_id) VALUES (3, 'Workshop', '2024-06-01', 1)"))
+    create_schema(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT rowid FROM events_fts WHERE events_fts MATCH 'workshop'")).all() == [(3,)]
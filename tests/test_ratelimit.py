@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.core import ratelimit
+
+# What render.yaml sets FORWARDED_ALLOW_IPS to
+TRUSTED_PROXIES = "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    """One route limited to a single request per client IP, behind uvicorn's proxy header handling."""
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "RATE_LIMITS", {"auth": (1 / 60, 1)})
+    monkeypatch.setattr(ratelimit, "buckets", ratelimit.MemoryBuckets())
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(ratelimit.limit_by_ip("auth"))])
+    async def login():
+        return {}
+
+    return ProxyHeadersMiddleware(app, trusted_hosts=TRUSTED_PROXIES)
+
+
+def statuses(app, peer, forwarded_for):
+    """Status codes of one request per X-Forwarded-For value, all sent from `peer`."""
+    async def send():
+        transport = httpx.ASGITransport(app=app, client=(peer, 4321))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                (await client.post("/login", headers={"X-Forwarded-For": ip})).status_code for ip in forwarded_for
+            ]
+    return asyncio.run(send())
+
+
+def test_requests_from_a_trusted_proxy_are_limited_per_forwarded_ip(limited_app):
+    assert statuses(limited_app, "10.20.0.7", ["203.0.113.1", "203.0.113.2", "203.0.113.1"]) == [200, 200, 429]
+
+
+def test_forwarded_for_is_ignored_from_other_peers(limited_app):
+    assert statuses(limited_app, "198.51.100.9", ["203.0.113.1", "203.0.113.2"]) == [200, 429]
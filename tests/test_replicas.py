@@ -0,0 +1,136 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core import cache as cache_module
+from app.core.kvstore import MemoryStore
+from app.core.response_cache import response_cache
+from app.db import replicas
+from app.db.database import Base, SessionLocal
+from models.event import Event
+from models.user import User
+
+
+@pytest.fixture
+def use_replicas(client, monkeypatch):
+    """Route reads to replicas at the given URLs for the rest of the test."""
+    monkeypatch.setattr(replicas, "_recent_writes", MemoryStore(maxsize=100))
+    created = []
+
+    def use(*urls):
+        replica_set = replicas.ReplicaSet(urls)
+        monkeypatch.setattr(replicas, "replica_set", replica_set)
+        created.append(replica_set)
+        return replica_set
+
+    yield use
+    for replica_set in created:
+        # On the client's event loop, where the pooled connections live
+        client.portal.call(replica_set.dispose)
+
+
+@pytest.fixture
+def event_on_both(tmp_path, make_user):
+    """
+    An event stored on the primary and, with a different title, in a second
+    SQLite file standing in for a replica. Returns (event id, organizer, replica URL).
+    """
+    organizer = make_user("Organizer")
+    with SessionLocal() as db:
+        event = Event(title="Primary copy", organizer_id=organizer.user.id)
+        db.add(event)
+        db.commit()
+        event_id = event.id
+
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), {"id": organizer.user.id, "name": "Organizer", "email": organizer.user.email})
+        conn.execute(Event.__table__.insert(), {"id": event_id, "title": "Replica copy", "organizer_id": organizer.user.id})
+    engine.dispose()
+    return event_id, organizer, url
+
+
+def test_reads_go_to_the_replica(client, use_replicas, event_on_both):
+    event_id, _, url = event_on_both
+    use_replicas(url)
+
+    resp = client.get(f"/events/{event_id}")
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "Replica copy"
+
+
+def test_reads_after_a_write_stick_to_the_primary(client, use_replicas, event_on_both, make_user):
+    event_id, _, url = event_on_both
+    use_replicas(url)
+    attendee = make_user("Attendee")
+
+    assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=attendee.headers).status_code == 201
+
+    # The replica hasn't seen the RSVP; the primary has
+    attendees = client.get(f"/bookings/event/{event_id}", headers=attendee.headers)
+    assert [row["user_id"] for row in attendees.json()] == [attendee.user.id]
+    assert [row["event_id"] for row in client.get("/bookings/me", headers=attendee.headers).json()] == [event_id]
+    assert client.get(f"/events/{event_id}").json()["title"] == "Primary copy"
+
+
+def test_sticky_reads_expire(client, use_replicas, event_on_both, monkeypatch):
+    event_id, _, url = event_on_both
+    use_replicas(url)
+    key = f"event:{event_id}"
+    client.portal.call(replicas.mark_write, key)
+    assert client.portal.call(replicas._recently_written, [key])
+
+    # MemoryStore expires keys by app.core.cache's clock
+    later = time.time() + replicas.REPLICA_STICKY_SECONDS + 1
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: later))
+    assert not client.portal.call(replicas._recently_written, [key])
+    assert client.get(f"/events/{event_id}").json()["title"] == "Replica copy"
+
+
+def test_missing_replica_fails_over_to_the_primary(client, use_replicas, event_on_both, tmp_path):
+    event_id, _, url = event_on_both
+    missing = f"sqlite:///{tmp_path / 'no-such-dir' / 'replica.db'}"
+    replica_set = use_replicas(missing)
+
+    resp = client.get(f"/events/{event_id}")
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "Primary copy"
+    assert not replica_set.replicas[0].healthy
+
+
+def test_failed_replica_is_skipped_for_a_healthy_one(client, use_replicas, event_on_both, tmp_path):
+    event_id, _, url = event_on_both
+    missing = f"sqlite:///{tmp_path / 'no-such-dir' / 'replica.db'}"
+    replica_set = use_replicas(missing, url)
+
+    assert client.get(f"/events/{event_id}").json()["title"] == "Replica copy"
+    assert [replica.healthy for replica in replica_set.replicas] == [False, True]
+
+
+def test_writes_are_marked_before_the_cache_is_invalidated(client, use_replicas, make_user, tmp_path, monkeypatch):
+    use_replicas(f"sqlite:///{tmp_path / 'replica.db'}")
+    organizer = make_user("Organizer")
+    created = client.post("/events/create", json={"title": "Meetup", "date": "2030-01-01T18:00:00"}, headers=organizer.headers)
+    event_id = created.json()["id"]
+    unmarked = []
+    invalidate = response_cache.invalidate
+
+    async def checking_invalidate(*namespaces):
+        # Feeds are always read from the primary, so they aren't marked
+        for namespace in namespaces:
+            if not namespace.endswith(":ics") and not await replicas._recently_written([namespace]):
+                unmarked.append(namespace)
+        await invalidate(*namespaces)
+
+    monkeypatch.setattr(response_cache, "invalidate", checking_invalidate)
+    attendee = make_user("Attendee")
+    assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=attendee.headers).status_code == 201
+    assert client.request("DELETE", "/bookings/cancel", json={"event_id": event_id}, headers=attendee.headers).status_code == 200
+    update = {"title": "Renamed", "date": "2030-01-01T18:00:00"}
+    assert client.put(f"/events/update/{event_id}", json=update, headers=organizer.headers).status_code == 200
+    assert client.delete(f"/events/delete/{event_id}", headers=organizer.headers).status_code == 200
+    assert unmarked == []
@@ -0,0 +1,138 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+from app.db.database import SessionLocal, write_session
+from app.main import app
+from app.services import reservations
+from models.booking import Booking, BOOKING_CONFIRMED, BOOKING_WAITLISTED
+from models.event import Event
+from models.job import Job
+
+# On SQLite, write_session lets one writer in at a time, so these tests check
+# that lock rather than the atomicity of the conditional UPDATE or the event
+# row locks. Run them with TEST_DATABASE_URL pointing at Postgres (see
+# conftest.py) to exercise those.
+CAPACITY = 20
+ATTENDEES = 2000
+
+
+@pytest.fixture
+def event(make_user):
+    organizer = make_user("Organizer")
+    with SessionLocal() as db:
+        row = Event(title="Launch party", organizer_id=organizer.user.id, capacity=CAPACITY)
+        db.add(row)
+        db.commit()
+        return row.id
+
+
+def send_concurrently(requests):
+    """Send (method, path, json, headers) requests to the app all at once; return the responses."""
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.request(method, path, json=body, headers=headers) for method, path, body, headers in requests)
+            )
+    return send()
+
+
+def post_concurrently(requests):
+    """Send (path, json, headers) POSTs to the app all at once; return the responses."""
+    return send_concurrently([("POST", path, body, headers) for path, body, headers in requests])
+
+
+def seats(event_id):
+    with SessionLocal() as db:
+        counts = dict(
+            db.execute(select(Booking.status, func.count()).where(Booking.event_id == event_id).group_by(Booking.status)).all()
+        )
+        return counts, db.get(Event, event_id).attendee_count
+
+
+def test_concurrent_rsvps_fill_capacity_exactly(database, run, make_user, event):
+    users = [make_user(f"Guest {i}") for i in range(ATTENDEES)]
+    responses = run(post_concurrently([("/bookings/rsvp", {"event_id": event}, user.headers) for user in users]))
+
+    assert [r.status_code for r in responses] == [201] * ATTENDEES
+    statuses = [r.json()["status"] for r in responses]
+    assert statuses.count(BOOKING_CONFIRMED) == CAPACITY
+    counts, attendee_count = seats(event)
+    assert counts == {BOOKING_CONFIRMED: CAPACITY, BOOKING_WAITLISTED: ATTENDEES - CAPACITY}
+    assert attendee_count == CAPACITY
+
+
+def test_concurrent_duplicate_rsvps_book_once(database, run, make_user, event):
+    user = make_user("Eager")
+    responses = run(post_concurrently([("/bookings/rsvp", {"event_id": event}, user.headers)] * 20))
+
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [201] + [400] * 19
+    counts, attendee_count = seats(event)
+    assert counts == {BOOKING_CONFIRMED: 1}
+    assert attendee_count == 1
+
+
+def test_cancellations_racing_rsvps_leave_no_seat_free_for_the_waitlist(database, run, make_user, event):
+    holders = [make_user(f"Holder {i}") for i in range(CAPACITY)]
+    run(post_concurrently([("/bookings/rsvp", {"event_id": event}, user.headers) for user in holders]))
+    newcomers = [make_user(f"Newcomer {i}") for i in range(CAPACITY * 5)]
+
+    requests = [("DELETE", "/bookings/cancel", {"event_id": event}, user.headers) for user in holders]
+    requests += [("POST", "/bookings/rsvp", {"event_id": event}, user.headers) for user in newcomers]
+    responses = run(send_concurrently(requests))
+
+    assert all(r.status_code in (200, 201) for r in responses), [r.text for r in responses if r.status_code >= 300]
+    counts, attendee_count = seats(event)
+    assert counts[BOOKING_CONFIRMED] == attendee_count == CAPACITY
+    assert counts[BOOKING_WAITLISTED] == len(newcomers) - CAPACITY
+
+
+def test_partial_update_keeps_the_capacity(client, make_user):
+    organizer = make_user("Organizer")
+    created = client.post(
+        "/events/create",
+        json={"title": "Workshop", "date": "2030-01-01T18:00:00", "capacity": 1},
+        headers=organizer.headers,
+    )
+    assert created.status_code == 200, created.text
+    event_id = created.json()["id"]
+    for name in ("First", "Second"):
+        assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=make_user(name).headers).status_code == 201
+
+    resp = client.put(
+        f"/events/update/{event_id}",
+        json={"title": "Workshop (moved)", "date": "2030-01-02T18:00:00"},
+        headers=organizer.headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["capacity"] == 1
+    counts, attendee_count = seats(event_id)
+    assert counts == {BOOKING_CONFIRMED: 1, BOOKING_WAITLISTED: 1}
+    assert attendee_count == 1
+
+
+def test_reconcile_promotes_into_the_seats_it_frees(database, run, make_user):
+    organizer, seated, waiting = make_user("Organizer"), make_user("Seated"), make_user("Waiting")
+    with SessionLocal() as db:
+        # attendee_count claims both seats, but only one booking holds one
+        row = Event(title="Drifted", organizer_id=organizer.user.id, capacity=2, attendee_count=2)
+        db.add(row)
+        db.flush()
+        db.add(Booking(user_id=seated.user.id, event_id=row.id, status=BOOKING_CONFIRMED))
+        db.add(Booking(user_id=waiting.user.id, event_id=row.id, status=BOOKING_WAITLISTED))
+        db.commit()
+        event_id = row.id
+
+    async def reconcile():
+        async with write_session() as db:
+            return await reservations.reconcile_attendee_counts(db)
+
+    assert run(reconcile()) == 1
+    counts, attendee_count = seats(event_id)
+    assert counts == {BOOKING_CONFIRMED: 2}
+    assert attendee_count == 2
+    with SessionLocal() as db:
+        assert db.scalars(select(Job.kind)).all() == ["bookings.promoted"]
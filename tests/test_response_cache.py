@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.kvstore import FakeRedis, MemoryStore, RedisStore
+from app.core.response_cache import ResponseCache
+
+
+@pytest.fixture(params=["memory", "fakeredis"])
+def cache(request):
+    store = MemoryStore(maxsize=100) if request.param == "memory" else RedisStore(FakeRedis())
+    return ResponseCache(store, ttl=30)
+
+
+def test_set_fills_the_version_get_looked_up(cache):
+    async def scenario():
+        entry, version = await cache.get("event:1")
+        assert entry is None
+        await cache.set("event:1", "", b'{"title":"Old"}', {"ETag": '"1"'}, version)
+        entry, again = await cache.get("event:1")
+        assert entry == {"body": '{"title":"Old"}', "headers": {"ETag": '"1"'}}
+        assert again == version
+    asyncio.run(scenario())
+
+
+def test_body_rendered_before_an_invalidation_is_not_served_after_it(cache):
+    async def scenario():
+        # A reader misses and renders from the old row...
+        entry, version = await cache.get("event:1")
+        assert entry is None
+        # ...while a writer commits and invalidates
+        await cache.invalidate("event:1")
+        await cache.set("event:1", "", b'{"title":"Old"}', {}, version)
+
+        entry, current = await cache.get("event:1")
+        assert entry is None
+        assert current != version
+    asyncio.run(scenario())
+
+
+def test_memory_store_bounds_its_counters():
+    store = MemoryStore(maxsize=3)
+
+    async def scenario():
+        for i in range(10):
+            await store.incr(f"v:event:{i}")
+        assert len(store._counters) == 3
+        # The oldest counters were evicted and read as missing
+        assert await store.get("v:event:0") is None
+        assert await store.get("v:event:9") == b"1"
+    asyncio.run(scenario())
+
+
+def test_evicted_version_is_reseeded_above_the_old_one():
+    cache = ResponseCache(MemoryStore(maxsize=1), ttl=30)
+
+    async def scenario():
+        _, first = await cache.get("event:1")
+        await cache.invalidate("event:1")
+        _, bumped = await cache.get("event:1")
+        # Another namespace's counter pushes this one out
+        await cache.get("event:2")
+        await cache.invalidate("event:2")
+        _, reseeded = await cache.get("event:1")
+        assert int(first) < int(bumped) < int(reseeded)
+    asyncio.run(scenario())
+
+
+def test_rsvp_and_cancel_refresh_the_cached_event_list(client, make_user):
+    organizer, guest = make_user("Organizer"), make_user("Guest")
+    created = client.post("/events/create", json={"title": "Meetup", "date": "2030-01-01T18:00:00"}, headers=organizer.headers)
+    event_id = created.json()["id"]
+
+    def listed_count():
+        return {e["id"]: e["attendee_count"] for e in client.get("/events/all").json()}[event_id]
+
+    assert listed_count() == 0
+    assert client.post("/bookings/rsvp", json={"event_id": event_id}, headers=guest.headers).status_code == 201
+    assert listed_count() == 1
+    assert client.request("DELETE", "/bookings/cancel", json={"event_id": event_id}, headers=guest.headers).status_code == 200
+    assert listed_count() == 0
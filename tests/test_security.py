@@ -0,0 +1,13 @@
+import pytest
+
+from app.core import security
+
+
+def test_key_ring_requires_a_secret(monkeypatch):
+    monkeypatch.delenv("JWT_KEYS", raising=False)
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    with pytest.raises(RuntimeError, match="JWT_KEYS or JWT_SECRET"):
+        security._load_key_ring()
+
+    monkeypatch.setenv("JWT_SECRET", "s3cret")
+    assert security._load_key_ring() == {"default": "s3cret"}
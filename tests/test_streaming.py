@@ -0,0 +1,90 @@
+import asyncio
+import csv
+import io
+
+from app.db.database import SessionLocal
+from app.main import app
+from models.booking import Booking
+from models.event import Event
+from models.user import User
+
+
+async def first_message(path: str, headers: dict, timeout: float = 2):
+    """
+    Call the ASGI app directly and return the response headers and the first
+    complete SSE message, then disconnect. Clients can't read an endless
+    stream through TestClient, which waits for the whole body.
+    """
+    sent = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, sent.put))
+    try:
+        start = await asyncio.wait_for(sent.get(), timeout)
+        body = b""
+        while b"\n\n" not in body:
+            body += (await asyncio.wait_for(sent.get(), timeout)).get("body", b"")
+        return {name.decode(): value.decode() for name, value in start["headers"]}, body
+    finally:
+        disconnected.set()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_live_stream_is_not_compressed(database, run, make_user):
+    organizer = make_user("Organizer")
+    with SessionLocal() as db:
+        event = Event(title="Concert", organizer_id=organizer.user.id, capacity=10)
+        db.add(event)
+        db.commit()
+        event_id = event.id
+
+    headers, body = run(first_message(f"/events/{event_id}/live", {"Accept-Encoding": "gzip, br"}))
+
+    assert headers["content-type"].startswith("text/event-stream")
+    assert headers.get("content-encoding") in (None, "identity")
+    assert body.startswith(b"data: {")
+    assert b'"attendee_count":0' in body
+
+
+def test_attendee_export_is_not_compressed(client, make_user):
+    organizer = make_user("Organizer")
+    with SessionLocal() as db:
+        event = Event(title="Conference", organizer_id=organizer.user.id)
+        db.add(event)
+        db.flush()
+        for i in range(50):
+            user = User(name=f"Guest {i}", email=f"guest{i}@example.com")
+            db.add(user)
+            db.flush()
+            db.add(Booking(user_id=user.id, event_id=event.id))
+        db.commit()
+        event_id = event.id
+
+    resp = client.get(
+        f"/bookings/event/{event_id}/export",
+        headers={**organizer.headers, "Accept-Encoding": "gzip"},
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers.get("content-encoding") in (None, "identity")
+    rows = list(csv.reader(io.StringIO(resp.text)))
+    assert len(rows) == 51